@@ -54,6 +54,100 @@ class InvalidMaxWorkersError(EvalError):
         self.message = f"Invalid max_workers '{max_workers}' specified. Valid values are positive integers or 'auto'."
 
 
+class InvalidJudgeBatchError(EvalError):
+    """
+    Error raised when judge_batch_size or judge_max_concurrent_batches isn't a positive int
+
+    Attributes
+        message     error message to be printed on raise
+        name        name of the setting
+        value       value specified
+    """
+
+    def __init__(self, name, value) -> None:
+        super().__init__()
+        self.name = name
+        self.value = value
+        self.message = (
+            f"Invalid {name} '{value}' specified. Valid values are positive integers."
+        )
+
+
+class InvalidScoringTemplateError(EvalError):
+    """
+    Error raised when scoring_template isn't a supported scoring template
+
+    Attributes
+        message             error message to be printed on raise
+        scoring_template    scoring_template specified
+    """
+
+    def __init__(self, scoring_template) -> None:
+        super().__init__()
+        self.scoring_template = scoring_template
+        self.message = f"Invalid scoring_template '{scoring_template}' specified. Valid values are 'mtbench', 'binary', 'ternary', 'continuous' or 'likert'."
+
+
+class InvalidJudgeAggregationError(EvalError):
+    """
+    Error raised when judge_aggregation isn't a supported aggregation
+
+    Attributes
+        message             error message to be printed on raise
+        judge_aggregation   judge_aggregation specified
+    """
+
+    def __init__(self, judge_aggregation) -> None:
+        super().__init__()
+        self.judge_aggregation = judge_aggregation
+        self.message = f"Invalid judge_aggregation '{judge_aggregation}' specified. Valid values are 'mean', 'median' or 'min'."
+
+
+class DuplicateJudgeModelError(EvalError):
+    """
+    Error raised when a panel of judges lists the same judge model more than once
+
+    Attributes
+        message             error message to be printed on raise
+        judge_model_name    judge model name specified more than once
+    """
+
+    def __init__(self, judge_model_name) -> None:
+        super().__init__()
+        self.judge_model_name = judge_model_name
+        self.message = f"Judge model '{judge_model_name}' specified more than once"
+
+
+class EmptyJudgePanelError(EvalError):
+    """
+    Error raised when judge_model_name is an empty list of judges
+
+    Attributes
+        message     error message to be printed on raise
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.message = "At least one judge model must be specified"
+
+
+class MissingJudgeServerError(EvalError):
+    """
+    Error raised when a server_url mapping has no endpoint for a judge of the panel
+
+    Attributes
+        message             error message to be printed on raise
+        judge_model_name    judge model without an endpoint
+    """
+
+    def __init__(self, judge_model_name) -> None:
+        super().__init__()
+        self.judge_model_name = judge_model_name
+        self.message = (
+            f"No model server endpoint specified for judge model '{judge_model_name}'"
+        )
+
+
 class InvalidGitRepoError(EvalError):
     """
     Error raised when taxonomy dir provided isn't a valid git repo
@@ -7,6 +7,9 @@ https://arxiv.org/html/2306.05685
 """
 
 # Standard
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
 import multiprocessing
 import os
 
@@ -19,7 +22,16 @@ from instructlab.eval import (
     mt_bench_branch_generator,
     mt_bench_judgment,
 )
-from instructlab.eval.exceptions import InvalidMaxWorkersError
+from instructlab.eval.exceptions import (
+    DuplicateJudgeModelError,
+    EmptyJudgePanelError,
+    InvalidJudgeAggregationError,
+    InvalidJudgeBatchError,
+    InvalidMaxWorkersError,
+    InvalidScoringTemplateError,
+    MissingJudgeServerError,
+)
+from instructlab.eval.mt_bench_common import SHORT_SCORING_TEMPLATES, ScoringTemplate
 
 # Local
 from .evaluator import Evaluator
@@ -30,28 +42,88 @@ logger = setup_logger(__name__)
 MIN_WORKERS_PER_GPU = 10
 
 
+@functools.lru_cache(maxsize=1)
+def _usable_cpu_count() -> int:
+    """Number of CPUs usable by this process, computed once per process"""
+    try:
+        # Not available on all platforms
+        return len(os.sched_getaffinity(0))  # type: ignore[attr-defined]
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
 class AbstractMTBenchEvaluator(Evaluator):
     """
     Abstract class of an MTBenchEvaluator for Multi-turn Benchmark (MT-Bench)
 
     Attributes
         model_name                  Name of the model to evaluate
-        judge_model_name            Name of the judge model
+        judge_model_name            Name of the judge model, or a list of names to score with a panel of judges
         output_dir                  The directory to use for evaluation output
         merge_system_user_message   Boolean indicating whether to merge system and user messages (required for Mistral based judges)
+        use_judgment_cache          Boolean indicating whether to reuse judgments cached in output_dir for identical judge inputs
+        judge_batch_size            Number of judgments each worker runs back to back before picking up new work
+        judge_max_concurrent_batches    Max judgment batches in flight.  None indicates to use max_workers.
+        cpu_affinity                Boolean indicating whether to pin each worker thread to its own CPU core (Linux only)
+        scoring_template            Judge rating scale: "mtbench" (1-10 with explanation), or "binary", "ternary", "continuous" or "likert" (rating only, much shorter judge output)
+        judge_aggregation           How to combine scores of a panel of judges: "mean", "median" or "min"
+        warm_up_connections         Boolean indicating whether to open the workers' connections to the model servers before each run starts
     """
 
+    # Parallel requests per serving GPU used by max_workers=auto
+    CONCURRENCY_PER_GPU = 32
+
     def __init__(
         self,
         model_name: str,
-        judge_model_name: str,
+        judge_model_name: str | list[str],
         output_dir: str = "eval_output",
         merge_system_user_message: bool = False,
+        use_judgment_cache: bool = False,
+        judge_batch_size: int = 1,
+        judge_max_concurrent_batches: int | None = None,
+        cpu_affinity: bool = False,
+        scoring_template: ScoringTemplate = "mtbench",
+        judge_aggregation: str = "mean",
+        warm_up_connections: bool = False,
     ) -> None:
+        if not (isinstance(judge_batch_size, int) and judge_batch_size > 0):
+            raise InvalidJudgeBatchError("judge_batch_size", judge_batch_size)
+        if judge_max_concurrent_batches is not None and not (
+            isinstance(judge_max_concurrent_batches, int)
+            and judge_max_concurrent_batches > 0
+        ):
+            raise InvalidJudgeBatchError(
+                "judge_max_concurrent_batches", judge_max_concurrent_batches
+            )
+        if scoring_template not in ("mtbench", *SHORT_SCORING_TEMPLATES):
+            raise InvalidScoringTemplateError(scoring_template)
+        if judge_aggregation not in mt_bench_judgment.JUDGE_AGGREGATIONS:
+            raise InvalidJudgeAggregationError(judge_aggregation)
+        if not isinstance(judge_model_name, str):
+            if len(judge_model_name) == 0:
+                raise EmptyJudgePanelError
+            seen_judge_model_names = set()
+            for name in judge_model_name:
+                # Each judge writes its own judgment file, named after it
+                if name in seen_judge_model_names:
+                    raise DuplicateJudgeModelError(name)
+                seen_judge_model_names.add(name)
         self.model_name = model_name
         self.judge_model_name = judge_model_name
         self.output_dir = output_dir
         self.merge_system_user_message = merge_system_user_message
+        self.use_judgment_cache = use_judgment_cache
+        self.judge_batch_size = judge_batch_size
+        self.judge_max_concurrent_batches = judge_max_concurrent_batches
+        self.cpu_affinity = cpu_affinity
+        self.scoring_template = scoring_template
+        self.judge_aggregation = judge_aggregation
+        self.warm_up_connections = warm_up_connections
+        # Loaded once and reused by every judgment run of this evaluator
+        self._judge_prompts = mt_bench_judgment.load_judge_prompts(
+            mt_bench_judgment.judge_prompt_file(self.name)
+        )
 
     def _calc_max_workers(
         self, max_workers: int | str | None, serving_gpus: int | None
@@ -59,25 +131,23 @@ class AbstractMTBenchEvaluator(Evaluator):
         calculated_max_workers = None
         if max_workers is not None:
             if max_workers == "auto":
-                try:
-                    # Not available on all platforms
-                    usable_cpu_count = len(os.sched_getaffinity(0))  # type: ignore[attr-defined]
-                except AttributeError:
-                    usable_cpu_count = multiprocessing.cpu_count()
                 if serving_gpus is not None:
-                    # Tune max_workers based on hardware configuration: min(#GPUs being used * 10, #CPU cores)
-                    # Please see https://github.com/instructlab/instructlab/issues/2050 for detailed explanation
-                    calculated_max_workers = min(
-                        max(serving_gpus, 1) * MIN_WORKERS_PER_GPU, usable_cpu_count
+                    # Tune max_workers based on hardware configuration: #GPUs being used * CONCURRENCY_PER_GPU
+                    # Workers block on HTTP requests to the model server rather than using the CPU, so
+                    # they aren't capped by the CPU count.  This replaces the min(#GPUs * 10, #CPU cores)
+                    # policy described in https://github.com/instructlab/instructlab/issues/2050
+                    calculated_max_workers = (
+                        max(serving_gpus, 1) * self.CONCURRENCY_PER_GPU
                     )
                     logger.debug(
                         "Auto tuning max_workers to %s", calculated_max_workers
                     )
                 else:
-                    # Don't be too aggressive when serving_gpus isn't specified. Use half the cpu count.
-                    calculated_max_workers = usable_cpu_count // 2
+                    # serving_gpus isn't specified. Scale with the cpu count, but keep enough
+                    # concurrency to keep a small server busy.
+                    calculated_max_workers = max(_usable_cpu_count() * 4, 32)
                     logger.debug(
-                        "max_workers set to auto but serving_gpus is not specified. Defaulting to (cpu count / 2): %s",
+                        "max_workers set to auto but serving_gpus is not specified. Defaulting to max(cpu count * 4, 32): %s",
                         calculated_max_workers,
                     )
             else:
@@ -88,13 +158,61 @@ class AbstractMTBenchEvaluator(Evaluator):
                     raise InvalidMaxWorkersError(max_workers)
         return calculated_max_workers
 
-    def _get_effective_max_workers(self, max_workers, serving_gpus):
+    def _get_effective_max_workers(self, max_workers, serving_gpus, server_url=None):
         if max_workers is not None:
             effective_max_workers = self._calc_max_workers(max_workers, serving_gpus)
         else:
             effective_max_workers = MIN_WORKERS_PER_GPU
+        if isinstance(server_url, list) and max_workers in (None, "auto"):
+            # Auto tuned and default values are per model server
+            effective_max_workers *= max(len(server_url), 1)
+            logger.debug(
+                "Scaling max_workers to %s for %s model servers",
+                effective_max_workers,
+                len(server_url),
+            )
+        if serving_gpus is not None:
+            num_servers = len(server_url) if isinstance(server_url, list) else 1
+            saturating_max_workers = serving_gpus * MIN_WORKERS_PER_GPU * num_servers
+            if effective_max_workers < saturating_max_workers:
+                logger.warning(
+                    "max_workers=%d likely undersaturates %d GPU model serving; consider >=%d",
+                    effective_max_workers,
+                    serving_gpus * num_servers,
+                    saturating_max_workers,
+                )
         return effective_max_workers
 
+    def _judge_model_names(self) -> list[str]:
+        if isinstance(self.judge_model_name, str):
+            return [self.judge_model_name]
+        return list(self.judge_model_name)
+
+    def _check_judge_server_url(self, server_url) -> None:
+        # Fail before any judge runs rather than partway through the panel
+        if isinstance(server_url, dict):
+            for judge_model_name in self._judge_model_names():
+                if judge_model_name not in server_url:
+                    raise MissingJudgeServerError(judge_model_name)
+
+    @staticmethod
+    def _judge_server_url(server_url, judge_model_name):
+        # server_url can map each judge of a panel to its own endpoint(s)
+        if isinstance(server_url, dict):
+            return server_url[judge_model_name]
+        return server_url
+
+    def _run_judges(self, judge_fn) -> tuple:
+        """Run judge_fn(judge_model_name) for every judge concurrently and aggregate the results"""
+        judge_model_names = self._judge_model_names()
+        if len(judge_model_names) == 1:
+            return judge_fn(judge_model_names[0])
+        with ThreadPoolExecutor(len(judge_model_names)) as executor:
+            results = list(executor.map(judge_fn, judge_model_names))
+        return mt_bench_judgment.aggregate_judgments(
+            results, judge_model_names, self.judge_aggregation
+        )
+
 
 class MTBenchEvaluator(AbstractMTBenchEvaluator):
     """
@@ -102,16 +220,23 @@ class MTBenchEvaluator(AbstractMTBenchEvaluator):
 
     Attributes
         model_name                  Name of the model to evaluate
-        judge_model_name            Name of the judge model
+        judge_model_name            Name of the judge model, or a list of names to score with a panel of judges
         output_dir                  The directory to use for evaluation output
         merge_system_user_message   Boolean indicating whether to merge system and user messages (required for Mistral based judges)
+        use_judgment_cache          Boolean indicating whether to reuse judgments cached in output_dir for identical judge inputs
+        judge_batch_size            Number of judgments each worker runs back to back before picking up new work
+        judge_max_concurrent_batches    Max judgment batches in flight.  None indicates to use max_workers.
+        cpu_affinity                Boolean indicating whether to pin each worker thread to its own CPU core (Linux only)
+        scoring_template            Judge rating scale: "mtbench" (1-10 with explanation), or "binary", "ternary", "continuous" or "likert" (rating only, much shorter judge output)
+        judge_aggregation           How to combine scores of a panel of judges: "mean", "median" or "min"
+        warm_up_connections         Boolean indicating whether to open the workers' connections to the model servers before each run starts
     """
 
     name = "mt_bench"
 
     def gen_answers(
         self,
-        server_url,
+        server_url: str | list[str],
         api_key: str | None = None,
         max_workers: int | str | None = None,
         serving_gpus: int | None = None,
@@ -121,39 +246,46 @@ class MTBenchEvaluator(AbstractMTBenchEvaluator):
         Asks questions to model
 
         Attributes
-            server_url      Model server endpoint (Ex: http://localhost:8000/v1) for the model being evaluated
+            server_url      Model server endpoint (Ex: http://localhost:8000/v1) for the model being evaluated, or a list of endpoints to distribute questions across
             api_key         API token for authenticating with model server
             max_workers     Max parallel workers to run the evaluation with (int or "auto").  None indicates to use value specified in constructor.
-            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto.  None indicates to use value specified in constructor.
+            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto (per model server).  None indicates to use value specified in constructor.
             http_client     Custom http client to use for requests
         """
-        logger.debug(locals())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("args=%s", {k: v for k, v in locals().items() if k != "self"})
         mt_bench_answers.generate_answers(
             self.model_name,
             server_url,
             api_key=api_key,
             output_dir=self.output_dir,
-            max_workers=self._get_effective_max_workers(max_workers, serving_gpus),
+            max_workers=self._get_effective_max_workers(
+                max_workers, serving_gpus, server_url
+            ),
             http_client=http_client,
+            cpu_affinity=self.cpu_affinity,
+            warm_up_connections=self.warm_up_connections,
         )
 
     def judge_answers(
         self,
-        server_url,
+        server_url: str | list[str] | dict[str, str | list[str]],
         api_key: str | None = None,
         max_workers: int | str | None = None,
         serving_gpus: int | None = None,
         http_client: httpx.Client | None = None,
+        resume: bool = False,
     ) -> tuple:
         """
         Runs MT-Bench judgment
 
         Attributes
-            server_url      Model server endpoint (Ex: http://localhost:8000/v1) for the judge model
+            server_url      Model server endpoint (Ex: http://localhost:8000/v1) for the judge model, or a list of endpoints to distribute questions across.  A panel of judges can map each judge model name to its endpoint(s).
             api_key         API token for authenticating with model server
             max_workers     Max parallel workers to run the evaluation with (int or "auto").  None indicates to use value specified in constructor.
-            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto.  None indicates to use value specified in constructor.
+            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto (per model server).  None indicates to use value specified in constructor.
             http_client     Custom http client to use for requests
+            resume          Keep judgments of a previous interrupted run for unchanged answers and only judge the rest
 
         Returns:
             overall_score   MT-Bench score for the overall model evaluation
@@ -161,15 +293,112 @@ class MTBenchEvaluator(AbstractMTBenchEvaluator):
             turn_scores     A list of indexed turn scores
             error_rate      Percentage of questions dropped due to errors during evaluation
         """
-        logger.debug(locals())
-        return mt_bench_judgment.generate_judgment(
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("args=%s", {k: v for k, v in locals().items() if k != "self"})
+        self._check_judge_server_url(server_url)
+
+        def judge(judge_model_name):
+            judge_server_url = self._judge_server_url(server_url, judge_model_name)
+            return mt_bench_judgment.generate_judgment(
+                self.model_name,
+                judge_model_name,
+                judge_server_url,
+                api_key=api_key,
+                max_workers=self._get_effective_max_workers(
+                    max_workers, serving_gpus, judge_server_url
+                ),
+                output_dir=self.output_dir,
+                merge_system_user_message=self.merge_system_user_message,
+                use_judgment_cache=self.use_judgment_cache,
+                batch_size=self.judge_batch_size,
+                max_concurrent_batches=self.judge_max_concurrent_batches,
+                cpu_affinity=self.cpu_affinity,
+                warm_up_connections=self.warm_up_connections,
+                scoring_template=self.scoring_template,
+                judge_prompts=self._judge_prompts,
+                resume=resume,
+                http_client=http_client,
+            )
+
+        return self._run_judges(judge)
+
+    def run_pipelined(
+        self,
+        answer_server_url: str | list[str],
+        judge_server_url: str | list[str] | dict[str, str | list[str]],
+        answer_api_key: str | None = None,
+        judge_api_key: str | None = None,
+        max_workers: int | str | None = None,
+        serving_gpus: int | None = None,
+        http_client: httpx.Client | None = None,
+    ) -> tuple:
+        """
+        Asks questions to model and runs MT-Bench judgment on each answer as soon as it is generated
+
+        Attributes
+            answer_server_url   Model server endpoint (Ex: http://localhost:8000/v1) for the model being evaluated, or a list of endpoints to distribute questions across
+            judge_server_url    Model server endpoint (Ex: http://localhost:8000/v1) for the judge model, or a list of endpoints to distribute questions across.  A panel of judges can map each judge model name to its endpoint(s).
+            answer_api_key      API token for authenticating with the model server being evaluated
+            judge_api_key       API token for authenticating with the judge model server
+            max_workers         Max parallel workers to run each phase with (int or "auto").  None indicates to use value specified in constructor.
+            serving_gpus        Number of gpus allocated for serving.  Used to tune with max_workers=auto (per model server).  None indicates to use value specified in constructor.
+            http_client         Custom http client to use for requests
+
+        Returns:
+            overall_score   MT-Bench score for the overall model evaluation
+            qa_pairs        Question and answer pairs (with scores) from the evaluation
+            turn_scores     A list of indexed turn scores
+            error_rate      Percentage of questions dropped due to errors during evaluation
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("args=%s", {k: v for k, v in locals().items() if k != "self"})
+        self._check_judge_server_url(judge_server_url)
+        if len(self._judge_model_names()) > 1:
+            # Every judge of a panel needs all of the answers
+            self.gen_answers(
+                answer_server_url,
+                answer_api_key,
+                max_workers,
+                serving_gpus,
+                http_client,
+            )
+            return self.judge_answers(
+                judge_server_url, judge_api_key, max_workers, serving_gpus, http_client
+            )
+        judge_model_name = self._judge_model_names()[0]
+        judge_server_url = self._judge_server_url(judge_server_url, judge_model_name)
+        answer_max_workers = self._get_effective_max_workers(
+            max_workers, serving_gpus, answer_server_url
+        )
+        judge_max_workers = self._get_effective_max_workers(
+            max_workers, serving_gpus, judge_server_url
+        )
+        return mt_bench_judgment.generate_judgment_pipelined(
+            functools.partial(
+                mt_bench_answers.generate_answers,
+                self.model_name,
+                answer_server_url,
+                api_key=answer_api_key,
+                output_dir=self.output_dir,
+                max_workers=answer_max_workers,
+                http_client=http_client,
+                cpu_affinity=self.cpu_affinity,
+                warm_up_connections=self.warm_up_connections,
+            ),
             self.model_name,
-            self.judge_model_name,
-            server_url,
-            api_key=api_key,
-            max_workers=self._get_effective_max_workers(max_workers, serving_gpus),
+            judge_model_name,
+            judge_server_url,
+            api_key=judge_api_key,
+            max_workers=judge_max_workers,
             output_dir=self.output_dir,
             merge_system_user_message=self.merge_system_user_message,
+            use_judgment_cache=self.use_judgment_cache,
+            batch_size=self.judge_batch_size,
+            max_concurrent_batches=self.judge_max_concurrent_batches,
+            cpu_affinity=self.cpu_affinity,
+            warm_up_connections=self.warm_up_connections,
+            scoring_template=self.scoring_template,
+            judge_prompts=self._judge_prompts,
             http_client=http_client,
         )
 
@@ -180,11 +409,18 @@ class MTBenchBranchEvaluator(AbstractMTBenchEvaluator):
 
     Attributes
         model_name                  Name of the model to evaluate
-        judge_model_name            Name of the judge model
+        judge_model_name            Name of the judge model, or a list of names to score with a panel of judges
         taxonomy_git_repo_path      Taxonomy git repo path
         branch                      Branch of taxonomy repo to eval QNAs against model
         output_dir                  The directory to use for evaluation output
         merge_system_user_message   Boolean indicating whether to merge system and user messages (required for Mistral based judges)
+        use_judgment_cache          Boolean indicating whether to reuse judgments cached in output_dir for identical judge inputs
+        judge_batch_size            Number of judgments each worker runs back to back before picking up new work
+        judge_max_concurrent_batches    Max judgment batches in flight.  None indicates to use max_workers.
+        cpu_affinity                Boolean indicating whether to pin each worker thread to its own CPU core (Linux only)
+        scoring_template            Judge rating scale: "mtbench" (1-10 with explanation), or "binary", "ternary", "continuous" or "likert" (rating only, much shorter judge output)
+        judge_aggregation           How to combine scores of a panel of judges: "mean", "median" or "min"
+        warm_up_connections         Boolean indicating whether to open the workers' connections to the model servers before each run starts
     """
 
     name = "mt_bench_branch"
@@ -192,24 +428,38 @@ class MTBenchBranchEvaluator(AbstractMTBenchEvaluator):
     def __init__(
         self,
         model_name: str,
-        judge_model_name: str,
+        judge_model_name: str | list[str],
         taxonomy_git_repo_path: str,
         branch: str,
         output_dir: str = "eval_output",
         merge_system_user_message: bool = False,
+        use_judgment_cache: bool = False,
+        judge_batch_size: int = 1,
+        judge_max_concurrent_batches: int | None = None,
+        cpu_affinity: bool = False,
+        scoring_template: ScoringTemplate = "mtbench",
+        judge_aggregation: str = "mean",
+        warm_up_connections: bool = False,
     ) -> None:
         super().__init__(
             model_name,
             judge_model_name,
             output_dir,
             merge_system_user_message,
+            use_judgment_cache,
+            judge_batch_size,
+            judge_max_concurrent_batches,
+            cpu_affinity,
+            scoring_template,
+            judge_aggregation,
+            warm_up_connections,
         )
         self.taxonomy_git_repo_path = taxonomy_git_repo_path
         self.branch = branch
 
     def gen_answers(
         self,
-        server_url,
+        server_url: str | list[str],
         api_key: str | None = None,
         max_workers: int | str | None = None,
         serving_gpus: int | None = None,
@@ -219,19 +469,21 @@ class MTBenchBranchEvaluator(AbstractMTBenchEvaluator):
         Asks questions to model
 
         Attributes
-            server_url  Model server endpoint (Ex: http://localhost:8000/v1) for the model being evaluated
+            server_url  Model server endpoint (Ex: http://localhost:8000/v1) for the model being evaluated, or a list of endpoints to distribute questions across
             api_key     API token for authenticating with model server
             max_workers     Max parallel workers to run the evaluation with (int or "auto").  None indicates to use value specified in constructor.
-            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto.  None indicates to use value specified in constructor.
+            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto (per model server).  None indicates to use value specified in constructor.
             http_client     Custom http client to use for requests
         """
-        logger.debug(locals())
-        mt_bench_branch_generator.generate(
-            self.judge_model_name,
-            self.branch,
-            self.taxonomy_git_repo_path,
-            self.output_dir,
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("args=%s", {k: v for k, v in locals().items() if k != "self"})
+        for judge_model_name in self._judge_model_names():
+            mt_bench_branch_generator.generate(
+                judge_model_name,
+                self.branch,
+                self.taxonomy_git_repo_path,
+                self.output_dir,
+            )
         mt_bench_answers.generate_answers(
             self.model_name,
             server_url,
@@ -239,46 +491,163 @@ class MTBenchBranchEvaluator(AbstractMTBenchEvaluator):
             branch=self.branch,
             output_dir=self.output_dir,
             data_dir=self.output_dir,
-            max_workers=self._get_effective_max_workers(max_workers, serving_gpus),
+            max_workers=self._get_effective_max_workers(
+                max_workers, serving_gpus, server_url
+            ),
             bench_name="mt_bench_branch",
             http_client=http_client,
+            cpu_affinity=self.cpu_affinity,
+            warm_up_connections=self.warm_up_connections,
         )
 
     def judge_answers(
         self,
-        server_url,
+        server_url: str | list[str] | dict[str, str | list[str]],
         api_key: str | None = None,
         max_workers: int | str | None = None,
         serving_gpus: int | None = None,
         http_client: httpx.Client | None = None,
+        resume: bool = False,
     ) -> tuple:
         """
         Runs MT-Bench-Branch judgment.  Judgments can be compared across runs with consistent question_id -> qna file name.
 
         Attributes
-            server_url      Model server endpoint (Ex: http://localhost:8000/v1) for the judge model
+            server_url      Model server endpoint (Ex: http://localhost:8000/v1) for the judge model, or a list of endpoints to distribute questions across.  A panel of judges can map each judge model name to its endpoint(s).
             api_key         API token for authenticating with model server
             max_workers     Max parallel workers to run the evaluation with (int or "auto").  None indicates to use value specified in constructor.
-            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto.  None indicates to use value specified in constructor.
+            serving_gpus    Number of gpus allocated for serving.  Used to tune with max_workers=auto (per model server).  None indicates to use value specified in constructor.
             http_client     Custom http client to use for requests
+            resume          Keep judgments of a previous interrupted run for unchanged answers and only judge the rest
 
         Returns:
             overall_score   Overall score from the evaluation
             qa_pairs        Question and answer pairs (with scores) from the evaluation
             error_rate      Percentage of questions dropped due to errors during evaluation
         """
-        logger.debug(locals())
-        overall_score, qa_pairs, _, error_rate = mt_bench_judgment.generate_judgment(
-            self.model_name,
-            self.judge_model_name,
-            server_url,
-            api_key=api_key,
-            branch=self.branch,
-            max_workers=self._get_effective_max_workers(max_workers, serving_gpus),
-            output_dir=self.output_dir,
-            data_dir=self.output_dir,
-            bench_name="mt_bench_branch",
-            merge_system_user_message=self.merge_system_user_message,
-            http_client=http_client,
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("args=%s", {k: v for k, v in locals().items() if k != "self"})
+        self._check_judge_server_url(server_url)
+
+        def judge(judge_model_name):
+            judge_server_url = self._judge_server_url(server_url, judge_model_name)
+            return mt_bench_judgment.generate_judgment(
+                self.model_name,
+                judge_model_name,
+                judge_server_url,
+                api_key=api_key,
+                branch=self.branch,
+                max_workers=self._get_effective_max_workers(
+                    max_workers, serving_gpus, judge_server_url
+                ),
+                output_dir=self.output_dir,
+                data_dir=self.output_dir,
+                bench_name="mt_bench_branch",
+                merge_system_user_message=self.merge_system_user_message,
+                use_judgment_cache=self.use_judgment_cache,
+                batch_size=self.judge_batch_size,
+                max_concurrent_batches=self.judge_max_concurrent_batches,
+                cpu_affinity=self.cpu_affinity,
+                warm_up_connections=self.warm_up_connections,
+                scoring_template=self.scoring_template,
+                judge_prompts=self._judge_prompts,
+                resume=resume,
+                http_client=http_client,
+            )
+
+        overall_score, qa_pairs, _, error_rate = self._run_judges(judge)
+        return overall_score, qa_pairs, error_rate
+
+    def run_pipelined(
+        self,
+        answer_server_url: str | list[str],
+        judge_server_url: str | list[str] | dict[str, str | list[str]],
+        answer_api_key: str | None = None,
+        judge_api_key: str | None = None,
+        max_workers: int | str | None = None,
+        serving_gpus: int | None = None,
+        http_client: httpx.Client | None = None,
+    ) -> tuple:
+        """
+        Asks questions to model and runs MT-Bench-Branch judgment on each answer as soon as it is generated
+
+        Attributes
+            answer_server_url   Model server endpoint (Ex: http://localhost:8000/v1) for the model being evaluated, or a list of endpoints to distribute questions across
+            judge_server_url    Model server endpoint (Ex: http://localhost:8000/v1) for the judge model, or a list of endpoints to distribute questions across.  A panel of judges can map each judge model name to its endpoint(s).
+            answer_api_key      API token for authenticating with the model server being evaluated
+            judge_api_key       API token for authenticating with the judge model server
+            max_workers         Max parallel workers to run each phase with (int or "auto").  None indicates to use value specified in constructor.
+            serving_gpus        Number of gpus allocated for serving.  Used to tune with max_workers=auto (per model server).  None indicates to use value specified in constructor.
+            http_client         Custom http client to use for requests
+
+        Returns:
+            overall_score   Overall score from the evaluation
+            qa_pairs        Question and answer pairs (with scores) from the evaluation
+            error_rate      Percentage of questions dropped due to errors during evaluation
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("args=%s", {k: v for k, v in locals().items() if k != "self"})
+        self._check_judge_server_url(judge_server_url)
+        if len(self._judge_model_names()) > 1:
+            # Every judge of a panel needs all of the answers
+            self.gen_answers(
+                answer_server_url,
+                answer_api_key,
+                max_workers,
+                serving_gpus,
+                http_client,
+            )
+            return self.judge_answers(
+                judge_server_url, judge_api_key, max_workers, serving_gpus, http_client
+            )
+        judge_model_name = self._judge_model_names()[0]
+        judge_server_url = self._judge_server_url(judge_server_url, judge_model_name)
+        mt_bench_branch_generator.generate(
+            judge_model_name,
+            self.branch,
+            self.taxonomy_git_repo_path,
+            self.output_dir,
+        )
+        answer_max_workers = self._get_effective_max_workers(
+            max_workers, serving_gpus, answer_server_url
+        )
+        judge_max_workers = self._get_effective_max_workers(
+            max_workers, serving_gpus, judge_server_url
+        )
+        overall_score, qa_pairs, _, error_rate = (
+            mt_bench_judgment.generate_judgment_pipelined(
+                functools.partial(
+                    mt_bench_answers.generate_answers,
+                    self.model_name,
+                    answer_server_url,
+                    api_key=answer_api_key,
+                    branch=self.branch,
+                    output_dir=self.output_dir,
+                    data_dir=self.output_dir,
+                    max_workers=answer_max_workers,
+                    bench_name="mt_bench_branch",
+                    http_client=http_client,
+                    cpu_affinity=self.cpu_affinity,
+                    warm_up_connections=self.warm_up_connections,
+                ),
+                self.model_name,
+                judge_model_name,
+                judge_server_url,
+                api_key=judge_api_key,
+                branch=self.branch,
+                max_workers=judge_max_workers,
+                output_dir=self.output_dir,
+                data_dir=self.output_dir,
+                bench_name="mt_bench_branch",
+                merge_system_user_message=self.merge_system_user_message,
+                use_judgment_cache=self.use_judgment_cache,
+                batch_size=self.judge_batch_size,
+                max_concurrent_batches=self.judge_max_concurrent_batches,
+                cpu_affinity=self.cpu_affinity,
+                warm_up_connections=self.warm_up_connections,
+                scoring_template=self.scoring_template,
+                judge_prompts=self._judge_prompts,
+                http_client=http_client,
+            )
         )
         return overall_score, qa_pairs, error_rate
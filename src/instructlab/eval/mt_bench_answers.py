@@ -1,11 +1,13 @@
 # SPDX-License-Identifier: Apache-2.0
 # Standard
+import asyncio
 import concurrent.futures
-import json
+import logging
 import os
 import time
 
 # Third Party
+import orjson
 import shortuuid
 import tqdm
 
@@ -14,11 +16,12 @@ from .logger_config import setup_logger
 from .mt_bench_common import (
     bench_dir,
     chat_completion_openai,
-    get_openai_client,
     load_questions,
+    open_openai_clients,
     temperature_config,
 )
 from .mt_bench_model_adapter import get_conversation_template  # type: ignore
+from .mt_bench_pool import WorkerPool
 
 logger = setup_logger(__name__)
 
@@ -29,7 +32,7 @@ def reorg_answer_file(answer_file):
     with open(answer_file, "r+", encoding="utf-8") as f:
         answers = {}
         for l in f:
-            qid = json.loads(l)["question_id"]
+            qid = orjson.loads(l)["question_id"]
             answers[qid] = l
 
         # Reset to the beginning of the file and clear it
@@ -93,8 +96,10 @@ def get_answer(
     }
 
     os.makedirs(os.path.dirname(answer_file), exist_ok=True)
-    with open(answer_file, "a", encoding="utf-8") as fout:
-        fout.write(json.dumps(ans) + "\n")
+    with open(answer_file, "ab") as fout:
+        fout.write(orjson.dumps(ans, option=orjson.OPT_APPEND_NEWLINE))
+
+    return ans
 
 
 def generate_answers(
@@ -112,11 +117,20 @@ def generate_answers(
     max_workers=1,
     bench_name="mt_bench",
     http_client=None,
+    on_answer=None,
+    cpu_affinity=False,
+    warm_up_connections=False,
 ):
-    """Generate model answers to be judged"""
-    logger.debug(locals())
+    """Generate model answers to be judged
 
-    openai_client = get_openai_client(model_api_base, api_key, http_client)
+    model_api_base can be a list of endpoints, in which case questions are
+    distributed round-robin across them.
+    on_answer, if provided, is called with each answer as soon as it is complete
+    cpu_affinity pins each worker thread to its own core (Linux only)
+    warm_up_connections opens the workers' connections to the endpoints up front
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("args=%s", locals())
 
     if data_dir is None:
         data_dir = os.path.join(os.path.dirname(__file__), "data")
@@ -138,7 +152,12 @@ def generate_answers(
         first_n = int(first_n_env)
         logger.debug("INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS=%s", first_n)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with (
+        open_openai_clients(
+            model_api_base, api_key, http_client, max_workers, warm_up_connections
+        ) as openai_clients,
+        WorkerPool(max_workers, cpu_affinity) as executor,
+    ):
         futures = []
         for i, question in enumerate(questions):
             if first_n is not None and i >= first_n:
@@ -152,13 +171,25 @@ def generate_answers(
                 max_tokens,
                 answer_file,
                 force_temperature,
-                openai_client,
+                openai_clients[i % len(openai_clients)],
             )
             futures.append(future)
 
         for future in tqdm.tqdm(
             concurrent.futures.as_completed(futures), total=len(futures)
         ):
-            future.result()
+            ans = future.result()
+            if on_answer is not None:
+                on_answer(ans)
 
     reorg_answer_file(answer_file)
+
+
+async def a_generate_answers(*args, **kwargs):
+    """Generate model answers to be judged without blocking the event loop
+
+    Takes the same arguments as generate_answers.  The requests themselves are
+    still made from generate_answers' worker threads, so this can be awaited
+    alongside other work (e.g. judgment against another server).
+    """
+    return await asyncio.to_thread(generate_answers, *args, **kwargs)
@@ -9,6 +9,7 @@ import time
 # Third Party
 from tqdm import tqdm
 import git
+import orjson
 import shortuuid
 import yaml
 
@@ -24,6 +25,9 @@ from .mt_bench_common import bench_dir
 
 logger = setup_logger(__name__)
 
+# Questions parsed from a taxonomy commit, under output_dir
+PROMPT_CACHE_DIR = ".prompt_cache"
+
 
 def get_file_paths(directory):
     logger.debug(locals())
@@ -51,69 +55,107 @@ def read_qna(fn):
     return contents.get("seed_examples")
 
 
+def read_questions(taxonomy_dir):
+    """Create questions, with reference answers, from the taxonomy checked out in taxonomy_dir"""
+    qna_file_list = get_file_paths(taxonomy_dir)
+    if len(qna_file_list) == 0:
+        raise EmptyTaxonomyError
+
+    question_lst = []
+    for qna_file_path in tqdm(qna_file_list):
+        examples = read_qna(qna_file_path)
+        qna_file = qna_file_path[len(taxonomy_dir) + 1 :]
+        if examples is None:
+            logger.warning("failed to load %s. skipping...", qna_file)
+            continue
+        for ex in examples:
+            q, a = ex.get("question"), ex.get("answer")
+            if q is None or a is None:
+                logger.warning("Skipping malformed file %s", qna_file)
+                continue
+
+            c = ex.get("context")
+            if c is not None:
+                t_1 = (
+                    "Given the context below:\n"
+                    + c
+                    + "\n"
+                    + "Answer the following question: "
+                    + q
+                )
+            else:
+                t_1 = q
+
+            # Generate a consistent hash to have consistent question_id across qna_files from different runs
+            str_bytes = bytes(q, "UTF-8")
+            m = hashlib.md5(str_bytes)
+            question_id = str(int(m.hexdigest(), base=16))
+            question_lst.append(
+                {
+                    "qna_file": qna_file,
+                    "question_id": question_id,
+                    "category": "taxonomy",
+                    "turns": [t_1],
+                    "reference": [a],
+                }
+            )
+    return question_lst
+
+
+def prompt_cache_file(output_dir, taxonomy_dir, commit):
+    """Get the file caching the questions read from taxonomy_dir at commit"""
+    key = hashlib.sha256(
+        f"{os.path.realpath(taxonomy_dir)}:{commit}".encode("utf-8")
+    ).hexdigest()
+    return os.path.join(output_dir, PROMPT_CACHE_DIR, f"{key}.json")
+
+
 def generate(judge_model_name, branch, taxonomy_dir, output_dir):
-    """Create questions and reference answers from taxonomy"""
+    """Create questions and reference answers from taxonomy
+
+    When the taxonomy has no local changes, the questions of a branch only
+    depend on the commit it points at, so they are cached in PROMPT_CACHE_DIR
+    and later runs against the same commit skip the checkout and qna.yaml
+    parsing.
+    """
     logger.debug(locals())
     restore_branch = None
     try:
+        question_lst = None
+        cache_file = None
         if branch is not None:
             taxonomy_repo = git.Repo(taxonomy_dir)
-            restore_branch = taxonomy_repo.active_branch
-            taxonomy_repo.git.checkout(branch)
-
-        qna_file_list = get_file_paths(taxonomy_dir)
-        if len(qna_file_list) == 0:
-            raise EmptyTaxonomyError
-
-        question_lst = []
-        reference_answers = []
-        for qna_file_path in tqdm(qna_file_list):
-            examples = read_qna(qna_file_path)
-            qna_file = qna_file_path[len(taxonomy_dir) + 1 :]
-            if examples is None:
-                logger.warning("failed to load %s. skipping...", qna_file)
-                continue
-            for ex in examples:
-                q, a = ex.get("question"), ex.get("answer")
-                if q is None or a is None:
-                    logger.warning("Skipping malformed file %s", qna_file)
-                    continue
-
-                c = ex.get("context")
-                if c is not None:
-                    t_1 = (
-                        "Given the context below:\n"
-                        + c
-                        + "\n"
-                        + "Answer the following question: "
-                        + q
-                    )
-                else:
-                    t_1 = q
-
-                # Generate a consistent hash to have consistent question_id across qna_files from different runs
-                str_bytes = bytes(q, "UTF-8")
-                m = hashlib.md5(str_bytes)
-                question_id = str(int(m.hexdigest(), base=16))
-                question_lst.append(
-                    {
-                        "qna_file": qna_file,
-                        "question_id": question_id,
-                        "category": "taxonomy",
-                        "turns": [t_1],
-                        "reference": [a],
-                    }
-                )
-
-                reference_answers.append(
-                    {
-                        "question_id": question_id,
-                        "answer_id": shortuuid.uuid(),
-                        "model_id": judge_model_name,
-                        "choices": [{"index": 0, "turns": [a]}],
-                        "tstamp": time.time(),
-                    }
+            # Local changes are carried over by the checkout, so the questions
+            # then depend on more than the commit
+            if not taxonomy_repo.is_dirty(untracked_files=True):
+                cache_file = prompt_cache_file(
+                    output_dir, taxonomy_dir, taxonomy_repo.git.rev_parse(branch)
                 )
+            if cache_file is not None and os.path.isfile(cache_file):
+                logger.debug("Loading cached questions: %s", cache_file)
+                with open(cache_file, "rb") as f:
+                    question_lst = orjson.loads(f.read())
+            else:
+                restore_branch = taxonomy_repo.active_branch
+                taxonomy_repo.git.checkout(branch)
+
+        if question_lst is None:
+            question_lst = read_questions(taxonomy_dir)
+            if cache_file is not None:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                with open(cache_file, "wb") as f:
+                    f.write(orjson.dumps(question_lst))
+
+        reference_answers = [
+            {
+                "question_id": question["question_id"],
+                "answer_id": shortuuid.uuid(),
+                "model_id": judge_model_name,
+                "choices": [{"index": 0, "turns": question["reference"]}],
+                "tstamp": time.time(),
+            }
+            for question in question_lst
+        ]
 
         logger.debug("Generated %s questions", len(question_lst))
 
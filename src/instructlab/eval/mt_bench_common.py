@@ -4,10 +4,13 @@ Common data structures and utilities.
 """
 
 # Standard
-from typing import Optional, TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional, TypedDict
 import ast
+import contextlib
 import dataclasses
-import json
+import hashlib
+import itertools
 import os
 import re
 import time
@@ -15,6 +18,7 @@ import time
 # Third Party
 import httpx
 import openai
+import orjson
 
 # First Party
 from instructlab.eval import exceptions
@@ -38,6 +42,31 @@ NEED_REF_CATS = ["math", "reasoning", "coding", "arena-hard-200", "taxonomy"]
 one_score_pattern = re.compile(r"\[\[(\d+\.?\d*)\]\]")
 one_score_pattern_backup = re.compile(r"\[(\d+\.?\d*)\]")
 
+# Judge output length for the default mtbench scoring template, which explains its rating
+JUDGE_MAX_TOKENS = 2048
+
+# Scoring templates that ask the judge for the rating alone, so it only decodes a few tokens
+ScoringTemplate = Literal["mtbench", "binary", "ternary", "continuous", "likert"]
+SHORT_SCORING_MAX_TOKENS = 8
+_EXPLANATION_INSTRUCTION = "Begin your evaluation by providing a short explanation. "
+_RATING_INSTRUCTION = 'After providing your explanation, you must rate the response on a scale of 1 to 10 by strictly following this format: "[[rating]]", for example: "Rating: [[5]]".'
+_SHORT_RATING_INSTRUCTION = 'Do not provide an explanation. Output only your rating {scale}, strictly following this format: "[[rating]]", for example: "[[{example}]]".'
+SHORT_SCORING_TEMPLATES = {
+    "binary": _SHORT_RATING_INSTRUCTION.format(
+        scale="as 1 if the response is acceptable or 0 if it is not", example="1"
+    ),
+    "ternary": _SHORT_RATING_INSTRUCTION.format(
+        scale="as 0 if the response is poor, 1 if it is partially acceptable or 2 if it is good",
+        example="1",
+    ),
+    "continuous": _SHORT_RATING_INSTRUCTION.format(
+        scale="as a decimal number from 0.0 to 1.0", example="0.5"
+    ),
+    "likert": _SHORT_RATING_INSTRUCTION.format(
+        scale="on a scale of 1 to 5", example="3"
+    ),
+}
+
 # Sampling temperature configs for categories
 temperature_config = {
     "writing": 0.7,
@@ -58,6 +87,7 @@ class Judge:
     prompt_template: dict
     ref_based: bool = False
     multi_turn: bool = False
+    max_tokens: int = JUDGE_MAX_TOKENS
 
 
 @dataclasses.dataclass
@@ -83,7 +113,7 @@ def load_questions(question_file: str, begin: Optional[int], end: Optional[int])
     with open(question_file, "r", encoding="utf-8") as ques_file:
         for line in ques_file:
             if line:
-                questions.append(json.loads(line))
+                questions.append(orjson.loads(line))
     questions = questions[begin:end]
     return questions
 
@@ -104,11 +134,34 @@ def _load_answers(answer_file):
     answers = {}
     with open(answer_file, encoding="utf-8") as fin:
         for line in fin:
-            l = json.loads(line)
+            l = orjson.loads(line)
             answers[l["question_id"]] = l
     return answers
 
 
+def apply_scoring_template(prompt_template: dict, scoring_template: str) -> dict:
+    """Rewrite a single rating judge prompt for the given scoring template"""
+    if scoring_template == "mtbench":
+        return prompt_template
+    if scoring_template not in SHORT_SCORING_TEMPLATES:
+        raise ValueError(f"invalid scoring template: {scoring_template}")
+    if not any(
+        _RATING_INSTRUCTION in prompt_template[key]
+        for key in ("system_prompt", "prompt_template")
+    ):
+        raise ValueError(
+            f"scoring template {scoring_template} isn't supported for judge prompt {prompt_template['name']}"
+        )
+    prompt_template = dict(prompt_template)
+    for key in ("system_prompt", "prompt_template"):
+        prompt_template[key] = (
+            prompt_template[key]
+            .replace(_EXPLANATION_INSTRUCTION, "")
+            .replace(_RATING_INSTRUCTION, SHORT_SCORING_TEMPLATES[scoring_template])
+        )
+    return prompt_template
+
+
 def load_judge_prompts(prompt_file: str) -> dict:
     """Load judge prompts.
 
@@ -119,11 +172,48 @@ def load_judge_prompts(prompt_file: str) -> dict:
     prompts = {}
     with open(prompt_file, encoding="utf-8") as fin:
         for line in fin:
-            l = json.loads(line)
+            l = orjson.loads(line)
             prompts[l["name"]] = l
     return prompts
 
 
+def judgment_cache_key(match: MatchSingle, merge_system_user_message: bool) -> str:
+    """SHA-256 of the canonicalized judge input for a match"""
+    ref_turns = None
+    if match.ref_answer is not None:
+        ref_turns = match.ref_answer["choices"][0]["turns"]
+    judge_input = {
+        "question_id": match.question["question_id"],
+        "question": match.question["turns"],
+        "answer": match.answer["choices"][0]["turns"],
+        "ref_answer": ref_turns,
+        "judge_model_name": match.judge.model_name,
+        "system_prompt": match.judge.prompt_template["system_prompt"],
+        "prompt_template": match.judge.prompt_template["prompt_template"],
+        "multi_turn": match.multi_turn,
+        "merge_system_user_message": merge_system_user_message,
+    }
+    return hashlib.sha256(
+        orjson.dumps(judge_input, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def load_judgment_cache(cache_file: str) -> dict:
+    """Load cached judgments.
+
+    The return value is a python dict of type:
+    Dict[cache_key: str -> judgment: str]
+    """
+    logger.debug(locals())
+    cache = {}
+    if os.path.isfile(cache_file):
+        with open(cache_file, encoding="utf-8") as fin:
+            for line in fin:
+                l = orjson.loads(line)
+                cache[l["key"]] = l["judgment"]
+    return cache
+
+
 def run_judge_single(
     question,
     answer,
@@ -170,7 +260,7 @@ def run_judge_single(
             model,
             conv,
             temperature=0,
-            max_tokens=2048,
+            max_tokens=judge.max_tokens,
             merge_system_user_message=merge_system_user_message,
         )
 
@@ -197,7 +287,12 @@ def run_judge_single(
 
 
 def play_a_match_single(
-    openai_client, match: MatchSingle, output_file: str, merge_system_user_message: bool
+    openai_client,
+    match: MatchSingle,
+    output_file: str,
+    merge_system_user_message: bool,
+    judgment_cache: dict | None = None,
+    judgment_cache_file: str | None = None,
 ) -> dict:
     question, model, answer, judge, ref_answer, multi_turn = (
         match.question,
@@ -210,6 +305,10 @@ def play_a_match_single(
 
     if judge.prompt_template["type"] == "single":
         judgment = None
+        cache_key = judgment_cache_key(match, merge_system_user_message)
+        if judgment_cache is not None:
+            judgment = judgment_cache.get(cache_key)
+        cached = judgment is not None
         retval = run_judge_single(
             question,
             answer,
@@ -222,6 +321,17 @@ def play_a_match_single(
         )
         score, user_prompt, judgment = retval
 
+        # Unparsable judgments (including API errors) are retried by later runs
+        if judgment_cache_file and not cached and score != -1:
+            os.makedirs(os.path.dirname(judgment_cache_file), exist_ok=True)
+            with open(judgment_cache_file, "ab") as fout:
+                fout.write(
+                    orjson.dumps(
+                        {"key": cache_key, "judgment": judgment},
+                        option=orjson.OPT_APPEND_NEWLINE,
+                    )
+                )
+
         question_id = question["question_id"]
         turn = 1 if not multi_turn else 2
         result = {
@@ -232,6 +342,7 @@ def play_a_match_single(
             "judgment": judgment,
             "score": score,
             "turn": turn,
+            "judge_input_hash": cache_key,
             "tstamp": time.time(),
         }
 
@@ -240,8 +351,8 @@ def play_a_match_single(
 
     if output_file:
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, "a", encoding="utf-8") as fout:
-            fout.write(json.dumps(result) + "\n")
+        with open(output_file, "ab") as fout:
+            fout.write(orjson.dumps(result, option=orjson.OPT_APPEND_NEWLINE))
 
     return result
 
@@ -377,3 +488,108 @@ def get_openai_client(
         base_url=model_api_base, api_key=api_key, http_client=http_client
     )
     return openai_client
+
+
+def get_openai_clients(
+    model_api_base: str | list[str],
+    api_key,
+    http_client: httpx.Client | None = None,
+    max_workers: int | None = None,
+    warm_up: bool = False,
+) -> list:
+    """Get a client for each model server endpoint.
+
+    Requests are distributed round-robin across the returned clients by question.
+    When no http_client is given, the clients share a connection pool that keeps
+    a connection alive per worker so concurrent requests don't reconnect.
+    warm_up opens those connections before returning (see warm_up_connections).
+    """
+    if isinstance(model_api_base, str):
+        model_api_base = [model_api_base]
+    if len(model_api_base) == 0:
+        raise ValueError("At least one model server endpoint must be specified")
+    if http_client is None and max_workers is not None:
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_workers, max_keepalive_connections=max_workers
+            ),
+            timeout=openai.DEFAULT_TIMEOUT,
+            follow_redirects=True,
+        )
+    if warm_up and http_client is not None and max_workers is not None:
+        warm_up_connections(http_client, model_api_base, max_workers)
+    return [
+        get_openai_client(api_base, api_key, http_client) for api_base in model_api_base
+    ]
+
+
+@contextlib.contextmanager
+def open_openai_clients(
+    model_api_base: str | list[str],
+    api_key,
+    http_client: httpx.Client | None = None,
+    max_workers: int | None = None,
+    warm_up: bool = False,
+):
+    """Get clients as get_openai_clients does, closing their connections on exit.
+
+    A given http_client is left open for the caller to reuse.
+    """
+    openai_clients = get_openai_clients(
+        model_api_base, api_key, http_client, max_workers, warm_up
+    )
+    try:
+        yield openai_clients
+    finally:
+        if http_client is None:
+            for openai_client in openai_clients:
+                openai_client.close()
+
+
+def warm_up_connections(
+    http_client: httpx.Client, model_api_base: list[str], max_workers: int
+):
+    """Open the keep-alive connections used by max_workers workers ahead of time.
+
+    Fires concurrent HEAD requests at each endpoint's /models so DNS lookup and
+    TCP/TLS handshakes happen before the run instead of on the first requests.
+    Responses (including auth errors) are ignored and connection errors are
+    only logged, the run itself reports unreachable servers.
+    """
+    connections_per_endpoint = max(max_workers // len(model_api_base), 1)
+    urls = [
+        f"{api_base.rstrip('/')}/models"
+        for api_base in model_api_base
+        for _ in range(connections_per_endpoint)
+    ]
+
+    def head(url):
+        try:
+            http_client.head(url)
+        except httpx.HTTPError as e:
+            logger.debug("Connection warm up to %s failed: %s", url, e)
+
+    with ThreadPoolExecutor(len(urls)) as executor:
+        list(executor.map(head, urls))
+
+
+def cpu_affinity_initializer(cpu_affinity: bool):
+    """Get a thread pool initializer that pins each worker thread to its own core.
+
+    Cores are assigned round-robin from the cores usable by the process. Returns
+    None if cpu_affinity is False or pinning isn't supported on this platform.
+    """
+    if not cpu_affinity:
+        return None
+    if not hasattr(os, "sched_setaffinity"):
+        logger.warning("cpu_affinity is not supported on this platform, ignoring")
+        return None
+    core_ids = sorted(os.sched_getaffinity(0))
+    worker_indexes = itertools.count()
+
+    def pin_worker():
+        core_id = core_ids[next(worker_indexes) % len(core_ids)]
+        # pid 0 applies to the calling thread
+        os.sched_setaffinity(0, {core_id})
+
+    return pin_worker
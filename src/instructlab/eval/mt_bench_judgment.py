@@ -1,11 +1,14 @@
 # SPDX-License-Identifier: Apache-2.0
 # Standard
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import logging
 import os
 
 # Third Party
 from tqdm import tqdm
 import numpy as np
+import orjson
 import pandas as pd
 
 # First Party
@@ -14,21 +17,30 @@ from instructlab.eval import exceptions
 # Local
 from .logger_config import setup_logger
 from .mt_bench_common import (
+    JUDGE_MAX_TOKENS,
     NEED_REF_CATS,
+    SHORT_SCORING_MAX_TOKENS,
     Judge,
     MatchSingle,
+    apply_scoring_template,
     bench_dir,
     check_data,
     get_model_list,
-    get_openai_client,
+    judgment_cache_key,
     load_judge_prompts,
+    load_judgment_cache,
     load_model_answers,
     load_questions,
+    open_openai_clients,
     play_a_match_single,
 )
+from .mt_bench_pool import WorkerPool
 
 logger = setup_logger(__name__)
 
+# Judgments shared across benchmarks and branches, keyed by the judge input
+JUDGMENT_CACHE_FILE = "judgments_cache.jsonl"
+
 
 def make_match_single(
     questions,
@@ -58,21 +70,39 @@ def make_match_single(
     return matches
 
 
-def make_judge_single(judge_model_name, judge_prompts) -> dict:
+def make_judge_single(
+    judge_model_name, judge_prompts, scoring_template="mtbench"
+) -> dict:
     """Setup the judge"""
+    max_tokens = (
+        JUDGE_MAX_TOKENS if scoring_template == "mtbench" else SHORT_SCORING_MAX_TOKENS
+    )
+
+    def prompt(name):
+        return apply_scoring_template(judge_prompts[name], scoring_template)
+
     judges = {}
-    judges["default"] = Judge(judge_model_name, judge_prompts["single-v1"])
+    judges["default"] = Judge(
+        judge_model_name, prompt("single-v1"), max_tokens=max_tokens
+    )
     judges["math"] = Judge(
-        judge_model_name, judge_prompts["single-math-v1"], ref_based=True
+        judge_model_name,
+        prompt("single-math-v1"),
+        ref_based=True,
+        max_tokens=max_tokens,
     )
     judges["default-mt"] = Judge(
-        judge_model_name, judge_prompts["single-v1-multi-turn"], multi_turn=True
+        judge_model_name,
+        prompt("single-v1-multi-turn"),
+        multi_turn=True,
+        max_tokens=max_tokens,
     )
     judges["math-mt"] = Judge(
         judge_model_name,
-        judge_prompts["single-math-v1-multi-turn"],
+        prompt("single-math-v1-multi-turn"),
         ref_based=True,
         multi_turn=True,
+        max_tokens=max_tokens,
     )
     return judges
 
@@ -97,11 +127,16 @@ def make_judgment(
     logger.debug("#error free judgments: %s", error_free_judgments_len)
     logger.debug("error rate: %s", error_rate)
 
+    # Per-turn score sums and counts, indexed by turn
+    scores = judgment_df["score"].to_numpy(dtype=np.float64)
+    turns = judgment_df["turn"].to_numpy(dtype=np.int64)
+    turn_counts = np.bincount(turns, minlength=3)
+    turn_sums = np.bincount(turns, weights=scores, minlength=3)
+
     turn_scores = []
     # First turn
-    df_1 = judgment_df[judgment_df["turn"] == 1].groupby(["model", "turn"]).mean()
-    if len(df_1.index) > 0:
-        overall_score = df_1["score"].iloc[0]
+    if turn_counts[1] > 0:
+        overall_score = turn_sums[1] / turn_counts[1]
         turn_scores.append(overall_score)
     else:
         raise exceptions.InvalidEvaluationResult(
@@ -110,14 +145,12 @@ def make_judgment(
 
     if bench_name == "mt_bench":
         # Second turn
-        df_2 = judgment_df[judgment_df["turn"] == 2].groupby(["model", "turn"]).mean()
-        if len(df_2.index) > 0:
-            turn2_score = df_2["score"].iloc[0]
+        if turn_counts[2] > 0:
+            turn2_score = turn_sums[2] / turn_counts[2]
             turn_scores.append(turn2_score)
 
             # Average
-            df_3 = judgment_df[["model", "score"]].groupby(["model"]).mean()
-            overall_score = df_3["score"].iloc[0]
+            overall_score = scores.mean()
         else:
             turn_scores.append("N/A")
 
@@ -141,7 +174,7 @@ def make_judgment(
     joined_df = joined_df[joined_df["score"] != -1]
 
     qa_pairs = []
-    for _, row in joined_df.iterrows():
+    for row in joined_df.to_dict("records"):
         qa_pair = {
             "question_id": row["question_id"],
             "score": row["score"],
@@ -155,20 +188,65 @@ def make_judgment(
     return overall_score, qa_pairs, turn_scores, error_rate
 
 
-def judge_model(
+def make_matches(questions, models, model_answers, judges, ref_answers):
+    """Setup the single and multi-turn matches for the questions"""
+    question_math = [q for q in questions if q["category"] in NEED_REF_CATS]
+    question_default = [q for q in questions if q["category"] not in NEED_REF_CATS]
+
+    matches = []
+    matches += make_match_single(
+        question_default, models, model_answers, judges["default"]
+    )
+    matches += make_match_single(
+        question_math,
+        models,
+        model_answers,
+        judges["math"],
+        ref_answers,
+    )
+    matches += make_match_single(
+        question_default,
+        models,
+        model_answers,
+        judges["default-mt"],
+        multi_turn=True,
+    )
+    matches += make_match_single(
+        question_math,
+        models,
+        model_answers,
+        judges["math-mt"],
+        ref_answers,
+        multi_turn=True,
+    )
+    return matches
+
+
+def judge_prompt_file(bench_name="mt_bench") -> str:
+    """Path of the builtin judge prompts for a benchmark"""
+    return os.path.join(
+        os.path.dirname(__file__), "data", bench_name, "judge_prompts.jsonl"
+    )
+
+
+def load_judge_data(
     model_name,
     judge_model_name,
-    openai_client,
     branch=None,
     bench_name="mt_bench",
     output_dir="eval_output",
     data_dir=None,
-    max_workers=1,
     first_n=None,
-    merge_system_user_message=False,
+    scoring_template="mtbench",
+    resume=False,
+    judge_prompts=None,
 ):
-    """Judge the model based on questions and reference answers"""
-    logger.debug(locals())
+    """Load the questions, reference answers and judges, and clear any previous judgment output unless resuming
+
+    judge_prompts, if provided, is used instead of loading the builtin judge prompts
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("args=%s", locals())
     package_data_dir = os.path.join(os.path.dirname(__file__), "data")
     use_builtin_ref_answers = False
     if data_dir is None:
@@ -178,8 +256,6 @@ def judge_model(
     data_base_dir = bench_dir(data_dir, bench_name, branch)
     output_base_dir = bench_dir(output_dir, bench_name, branch)
 
-    judge_file = os.path.join(package_data_dir, bench_name, "judge_prompts.jsonl")
-
     question_file = os.path.join(data_base_dir, "question.jsonl")
     answer_file = os.path.join(output_base_dir, "model_answer", f"{model_name}.jsonl")
     if use_builtin_ref_answers:
@@ -192,92 +268,186 @@ def judge_model(
     # Load questions
     questions = load_questions(question_file, None, None)
 
-    # Load answers
-    model_answers = load_model_answers(answer_file)
+    # Load reference answers
     ref_answers = load_model_answers(ref_answer_file, judge_model_name)
 
     # Load judge
-    judge_prompts = load_judge_prompts(judge_file)
+    if judge_prompts is None:
+        judge_prompts = load_judge_prompts(judge_prompt_file(bench_name))
 
     if first_n:
         questions = questions[:first_n]
 
-    models = get_model_list(answer_file)
-
-    judges = make_judge_single(judge_model_name, judge_prompts)
+    judges = make_judge_single(judge_model_name, judge_prompts, scoring_template)
     output_file = os.path.join(
         output_base_dir, "model_judgment", f"{judge_model_name}_single.jsonl"
     )
-    if os.path.isfile(output_file):
+    if os.path.isfile(output_file) and not resume:
         os.remove(output_file)
         logger.debug("Removing previous judgment file: %s", output_file)
 
-    check_data(questions, model_answers, ref_answers, models, judges)
+    return question_file, answer_file, output_file, questions, ref_answers, judges
+
+
+def load_judgment_cache_for_run(output_dir, use_judgment_cache):
+    """Load the judgment cache for output_dir, or (None, None) if the cache is disabled"""
+    if not use_judgment_cache:
+        return None, None
+    judgment_cache_file = os.path.join(output_dir, JUDGMENT_CACHE_FILE)
+    judgment_cache = load_judgment_cache(judgment_cache_file)
+    logger.debug("Loaded %s cached judgments", len(judgment_cache))
+    return judgment_cache, judgment_cache_file
+
+
+def resume_judgment(output_file, matches, merge_system_user_message=False):
+    """Keep previous judgments that are still valid for matches and return the matches left to play
+
+    A previous judgment is reused when it was made from the same judge input and
+    didn't fail.  The judgment file is rewritten with only the reused judgments.
+    """
+    if not os.path.isfile(output_file):
+        return matches
+    previous = {}
+    with open(output_file, encoding="utf-8") as fin:
+        for line in fin:
+            result = orjson.loads(line)
+            if result["score"] != -1 and "judge_input_hash" in result:
+                previous[result["judge_input_hash"]] = line
+
+    remaining_matches = []
+    reused = []
+    for match in matches:
+        line = previous.get(judgment_cache_key(match, merge_system_user_message))
+        if line is None:
+            remaining_matches.append(match)
+        else:
+            reused.append(line)
+    logger.debug("Resuming judgment with %s previous judgments", len(reused))
 
-    question_math = [q for q in questions if q["category"] in NEED_REF_CATS]
-    question_default = [q for q in questions if q["category"] not in NEED_REF_CATS]
+    with open(output_file, "w", encoding="utf-8") as fout:
+        fout.writelines(reused)
+    return remaining_matches
 
-    # Make matches
-    matches = []
-    matches += make_match_single(
-        question_default, models, model_answers, judges["default"]
-    )
-    matches += make_match_single(
-        question_math,
-        models,
-        model_answers,
-        judges["math"],
-        ref_answers,
-    )
-    matches += make_match_single(
-        question_default,
-        models,
-        model_answers,
-        judges["default-mt"],
-        multi_turn=True,
+
+def play_match_batch(
+    batch,
+    match_client,
+    output_file,
+    merge_system_user_message=False,
+    judgment_cache=None,
+    judgment_cache_file=None,
+):
+    """Play a batch of matches one after another, returning the number played"""
+    for match in batch:
+        play_a_match_single(
+            match_client(match),
+            match,
+            output_file=output_file,
+            merge_system_user_message=merge_system_user_message,
+            judgment_cache=judgment_cache,
+            judgment_cache_file=judgment_cache_file,
+        )
+    return len(batch)
+
+
+def judge_model(
+    model_name,
+    judge_model_name,
+    openai_clients,
+    branch=None,
+    bench_name="mt_bench",
+    output_dir="eval_output",
+    data_dir=None,
+    max_workers=1,
+    first_n=None,
+    merge_system_user_message=False,
+    use_judgment_cache=False,
+    batch_size=1,
+    max_concurrent_batches=None,
+    cpu_affinity=False,
+    scoring_template="mtbench",
+    resume=False,
+    judge_prompts=None,
+):
+    """Judge the model based on questions and reference answers
+
+    Matches are distributed round-robin by question across openai_clients and
+    played in batches of batch_size, with up to max_concurrent_batches
+    (max_workers if None) batches in flight.  cpu_affinity pins each worker
+    thread to its own core (Linux only).  With resume, matches already judged
+    in the previous judgment file are kept instead of judged again.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("args=%s", locals())
+    question_file, answer_file, output_file, questions, ref_answers, judges = (
+        load_judge_data(
+            model_name,
+            judge_model_name,
+            branch=branch,
+            bench_name=bench_name,
+            output_dir=output_dir,
+            data_dir=data_dir,
+            first_n=first_n,
+            scoring_template=scoring_template,
+            resume=resume,
+            judge_prompts=judge_prompts,
+        )
     )
-    matches += make_match_single(
-        question_math,
-        models,
-        model_answers,
-        judges["math-mt"],
-        ref_answers,
-        multi_turn=True,
+
+    # Load answers
+    model_answers = load_model_answers(answer_file)
+    models = get_model_list(answer_file)
+
+    check_data(questions, model_answers, ref_answers, models, judges)
+
+    judgment_cache, judgment_cache_file = load_judgment_cache_for_run(
+        output_dir, use_judgment_cache
     )
 
+    # Make matches
+    matches = make_matches(questions, models, model_answers, judges, ref_answers)
+    if resume:
+        matches = resume_judgment(output_file, matches, merge_system_user_message)
+
     logger.debug("bench_name=%s", bench_name)
     logger.debug("judge=%s", judge_model_name)
     logger.debug("model_list=%s", models)
     logger.debug("total_num_questions=%s", len(questions))
     logger.debug("total_num_matches=%s", len(matches))
 
+    question_indexes = {q["question_id"]: i for i, q in enumerate(questions)}
+
+    def match_client(match):
+        index = question_indexes[match.question["question_id"]]
+        return openai_clients[index % len(openai_clients)]
+
+    play_batch = functools.partial(
+        play_match_batch,
+        match_client=match_client,
+        output_file=output_file,
+        merge_system_user_message=merge_system_user_message,
+        judgment_cache=judgment_cache,
+        judgment_cache_file=judgment_cache_file,
+    )
+    if max_concurrent_batches is None:
+        max_concurrent_batches = max_workers
+
     # Play matches
-    if max_workers == 1:
+    if max_concurrent_batches == 1:
         for match in tqdm(matches):
-            play_a_match_single(
-                openai_client,
-                match,
-                output_file=output_file,
-                merge_system_user_message=merge_system_user_message,
-            )
+            play_batch([match])
     else:
-
-        def play_a_match_wrapper(match):
-            play_a_match_single(
-                openai_client,
-                match,
-                output_file=output_file,
-                merge_system_user_message=merge_system_user_message,
-            )
-
         np.random.seed(0)
         np.random.shuffle(matches)
 
-        with ThreadPoolExecutor(max_workers) as executor:
-            for match in tqdm(
-                executor.map(play_a_match_wrapper, matches), total=len(matches)
-            ):
-                pass
+        batches = [
+            matches[i : i + batch_size] for i in range(0, len(matches), batch_size)
+        ]
+        with WorkerPool(max_concurrent_batches, cpu_affinity) as executor:
+            futures = [executor.submit(play_batch, batch) for batch in batches]
+            with tqdm(total=len(matches)) as progress:
+                for future in futures:
+                    progress.update(future.result())
 
     return question_file, output_file, answer_file
 
@@ -295,33 +465,244 @@ def generate_judgment(
     first_n=None,
     merge_system_user_message=False,
     http_client=None,
+    use_judgment_cache=False,
+    batch_size=1,
+    max_concurrent_batches=None,
+    cpu_affinity=False,
+    scoring_template="mtbench",
+    resume=False,
+    judge_prompts=None,
+    warm_up_connections=False,
 ):
-    """Generate judgment with scores and qa_pairs for a model"""
-    logger.debug(locals())
-
-    openai_client = get_openai_client(model_api_base, api_key, http_client)
+    """Generate judgment with scores and qa_pairs for a model
+
+    model_api_base can be a list of endpoints, in which case questions are
+    distributed round-robin across them.
+    With use_judgment_cache, judgments are read from and appended to
+    JUDGMENT_CACHE_FILE in output_dir so identical judge inputs aren't re-sent.
+    scoring_template selects the rating scale; templates other than "mtbench"
+    ask for the rating alone (see mt_bench_common.SHORT_SCORING_TEMPLATES).
+    With resume, judgments left by a previous (e.g. interrupted) run for the
+    same judge inputs are kept and only the remaining matches are judged.
+    warm_up_connections opens the workers' connections to the endpoints up front.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("args=%s", locals())
 
     first_n_env = os.environ.get("INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS")
     if first_n_env is not None and first_n is None:
         first_n = int(first_n_env)
         logger.debug("INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS=%s", first_n)
 
-    question_file, judgment_file, answer_file = judge_model(
-        model_name,
-        judge_model_name,
-        openai_client,
+    with open_openai_clients(
+        model_api_base,
+        api_key,
+        http_client,
+        max_concurrent_batches or max_workers,
+        warm_up_connections,
+    ) as openai_clients:
+        question_file, judgment_file, answer_file = judge_model(
+            model_name,
+            judge_model_name,
+            openai_clients,
+            bench_name=bench_name,
+            output_dir=output_dir,
+            data_dir=data_dir,
+            branch=branch,
+            max_workers=max_workers,
+            first_n=first_n,
+            merge_system_user_message=merge_system_user_message,
+            use_judgment_cache=use_judgment_cache,
+            batch_size=batch_size,
+            max_concurrent_batches=max_concurrent_batches,
+            cpu_affinity=cpu_affinity,
+            scoring_template=scoring_template,
+            resume=resume,
+            judge_prompts=judge_prompts,
+        )
+
+    return make_judgment(
+        question_file,
+        judgment_file,
+        answer_file,
         bench_name=bench_name,
-        output_dir=output_dir,
-        data_dir=data_dir,
-        branch=branch,
-        max_workers=max_workers,
-        first_n=first_n,
+    )
+
+
+JUDGE_AGGREGATIONS = {"mean": np.mean, "median": np.median, "min": np.min}
+
+
+def aggregate_judgments(results, judge_model_names, aggregation="mean"):
+    """Combine generate_judgment results from a panel of judges
+
+    overall_score, turn_scores and error_rate are aggregated across judges with
+    aggregation ("mean", "median" or "min").  qa_pairs from every judge are
+    returned, each tagged with the "judge" that scored it.
+    """
+    if aggregation not in JUDGE_AGGREGATIONS:
+        raise ValueError(f"invalid judge aggregation: {aggregation}")
+    aggregate = JUDGE_AGGREGATIONS[aggregation]
+
+    overall_score = aggregate([result[0] for result in results])
+    qa_pairs = [
+        dict(qa_pair, judge=judge_model_name)
+        for judge_model_name, result in zip(judge_model_names, results)
+        for qa_pair in result[1]
+    ]
+    turn_scores = []
+    for turn in range(max(len(result[2]) for result in results)):
+        scores = [
+            result[2][turn]
+            for result in results
+            if turn < len(result[2]) and result[2][turn] != "N/A"
+        ]
+        turn_scores.append(aggregate(scores) if scores else "N/A")
+    error_rate = np.mean([result[3] for result in results])
+    return overall_score, qa_pairs, turn_scores, error_rate
+
+
+def qa_pairs_columnar(qa_pairs):
+    """Get a column oriented view of qa_pairs for aggregating scores
+
+    Returns a dict mapping each qa_pair field, other than the question and
+    answer text, to a numpy array with a value per qa_pair (e.g.
+    qa_pairs_columnar(qa_pairs)["score"].mean()).
+    """
+    fields = ["question_id", "score"]
+    if qa_pairs:
+        fields += [
+            field
+            for field in qa_pairs[0]
+            if field not in fields and field not in ("question", "answer")
+        ]
+    columns = {
+        field: np.array([qa_pair[field] for qa_pair in qa_pairs]) for field in fields
+    }
+    columns["score"] = columns["score"].astype(np.float64)
+    return columns
+
+
+async def a_generate_judgment(*args, **kwargs):
+    """Generate judgment without blocking the event loop
+
+    Takes the same arguments and returns the same values as generate_judgment.
+    """
+    return await asyncio.to_thread(generate_judgment, *args, **kwargs)
+
+
+def generate_judgment_pipelined(
+    generate_answers_fn,
+    model_name,
+    judge_model_name,
+    model_api_base,
+    api_key=None,
+    bench_name="mt_bench",
+    output_dir="eval_output",
+    data_dir=None,
+    branch=None,
+    max_workers=1,
+    first_n=None,
+    merge_system_user_message=False,
+    http_client=None,
+    use_judgment_cache=False,
+    batch_size=1,
+    max_concurrent_batches=None,
+    cpu_affinity=False,
+    scoring_template="mtbench",
+    judge_prompts=None,
+    warm_up_connections=False,
+):
+    """Generate judgment while answers are being generated
+
+    generate_answers_fn is called with an on_answer callback (see
+    mt_bench_answers.generate_answers) and each question is judged as soon as
+    its answer is complete, instead of waiting for all answers first.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("args=%s", locals())
+
+    first_n_env = os.environ.get("INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS")
+    if first_n_env is not None and first_n is None:
+        first_n = int(first_n_env)
+        logger.debug("INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS=%s", first_n)
+
+    question_file, answer_file, output_file, questions, ref_answers, judges = (
+        load_judge_data(
+            model_name,
+            judge_model_name,
+            branch=branch,
+            bench_name=bench_name,
+            output_dir=output_dir,
+            data_dir=data_dir,
+            first_n=first_n,
+            scoring_template=scoring_template,
+            judge_prompts=judge_prompts,
+        )
+    )
+    models = get_model_list(answer_file)
+    question_indexes = {q["question_id"]: i for i, q in enumerate(questions)}
+
+    # Model answers don't exist yet, only check the reference answers
+    check_data(questions, {}, ref_answers, [], judges)
+
+    judgment_cache, judgment_cache_file = load_judgment_cache_for_run(
+        output_dir, use_judgment_cache
+    )
+
+    def match_client(match):
+        index = question_indexes[match.question["question_id"]]
+        return openai_clients[index % len(openai_clients)]
+
+    play_batch = functools.partial(
+        play_match_batch,
+        match_client=match_client,
+        output_file=output_file,
         merge_system_user_message=merge_system_user_message,
+        judgment_cache=judgment_cache,
+        judgment_cache_file=judgment_cache_file,
     )
+    if max_concurrent_batches is None:
+        max_concurrent_batches = max_workers
+
+    with (
+        open_openai_clients(
+            model_api_base,
+            api_key,
+            http_client,
+            max_concurrent_batches or max_workers,
+            warm_up_connections,
+        ) as openai_clients,
+        WorkerPool(max_concurrent_batches, cpu_affinity) as executor,
+    ):
+        futures = []
+        pending = []
+
+        def on_answer(answer):
+            index = question_indexes.get(answer["question_id"])
+            if index is None:
+                return
+            model_answers = {m: {answer["question_id"]: answer} for m in models}
+            pending.extend(
+                make_matches(
+                    [questions[index]], models, model_answers, judges, ref_answers
+                )
+            )
+            while len(pending) >= batch_size:
+                futures.append(executor.submit(play_batch, pending[:batch_size]))
+                del pending[:batch_size]
+
+        generate_answers_fn(on_answer=on_answer)
+        if pending:
+            futures.append(executor.submit(play_batch, pending))
+
+        num_matches = 0
+        for future in tqdm(futures):
+            num_matches += future.result()
+        logger.debug("total_num_matches=%s", num_matches)
 
     return make_judgment(
         question_file,
-        judgment_file,
+        output_file,
         answer_file,
         bench_name=bench_name,
     )
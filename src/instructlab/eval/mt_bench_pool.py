@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: Apache-2.0
+"""
+Worker thread pools reused across MT-Bench answer generation and judgment runs.
+"""
+
+# Standard
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import concurrent.futures
+import os
+import threading
+
+# Local
+from .logger_config import setup_logger
+from .mt_bench_common import cpu_affinity_initializer
+
+logger = setup_logger(__name__)
+
+# Pools left idle by finished runs, by (max_workers, cpu_affinity)
+_IDLE_POOLS: dict[tuple[int, bool], list[ThreadPoolExecutor]] = {}
+_IDLE_POOLS_LOCK = threading.Lock()
+
+
+def _new_pool(max_workers: int, cpu_affinity: bool) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers,
+        initializer=cpu_affinity_initializer(cpu_affinity),
+        thread_name_prefix="mt_bench_worker",
+    )
+
+
+def _get_pool(max_workers: int, cpu_affinity: bool = False) -> ThreadPoolExecutor:
+    """Take an idle pool of max_workers threads left by an earlier run, or start one"""
+    with _IDLE_POOLS_LOCK:
+        idle_pools = _IDLE_POOLS.get((max_workers, cpu_affinity))
+        if idle_pools:
+            return idle_pools.pop()
+    logger.debug("Starting worker pool of %s threads", max_workers)
+    return _new_pool(max_workers, cpu_affinity)
+
+
+def _release_pool(
+    pool: ThreadPoolExecutor, max_workers: int, cpu_affinity: bool
+) -> None:
+    with _IDLE_POOLS_LOCK:
+        _IDLE_POOLS.setdefault((max_workers, cpu_affinity), []).append(pool)
+
+
+@atexit.register
+def _shutdown_idle_pools() -> None:
+    with _IDLE_POOLS_LOCK:
+        idle_pools = [pool for pools in _IDLE_POOLS.values() for pool in pools]
+        _IDLE_POOLS.clear()
+    for pool in idle_pools:
+        pool.shutdown()
+
+
+class WorkerPool:
+    """Runs tasks on max_workers threads reused across runs
+
+    Used as a context manager like ThreadPoolExecutor.  Every run gets a pool
+    of its own, so concurrent runs (e.g. a panel of judges, or answers and
+    judgments of a pipelined run) don't share threads.  Exiting waits for the
+    submitted tasks and keeps the threads for the next run with the same
+    max_workers and cpu_affinity.
+    """
+
+    def __init__(self, max_workers: int | None, cpu_affinity: bool = False) -> None:
+        if max_workers is None:
+            # ThreadPoolExecutor's default
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        self._max_workers = max_workers
+        self._cpu_affinity = cpu_affinity
+        self._executor = _get_pool(max_workers, cpu_affinity)
+        self._futures: list[concurrent.futures.Future] = []
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future = self._executor.submit(fn, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        concurrent.futures.wait(self._futures)
+        _release_pool(self._executor, self._max_workers, self._cpu_affinity)
@@ -4,8 +4,23 @@
 from unittest import mock
 from unittest.mock import patch
 
+# Third Party
+import pytest
+
 # First Party
-from instructlab.eval.mt_bench import MTBenchBranchEvaluator, MTBenchEvaluator
+from instructlab.eval.exceptions import (
+    DuplicateJudgeModelError,
+    EmptyJudgePanelError,
+    InvalidJudgeAggregationError,
+    InvalidJudgeBatchError,
+    InvalidScoringTemplateError,
+    MissingJudgeServerError,
+)
+from instructlab.eval.mt_bench import (
+    MTBenchBranchEvaluator,
+    MTBenchEvaluator,
+    _usable_cpu_count,
+)
 
 
 def gen_qa_pairs(odd):
@@ -75,6 +90,9 @@ def test_mt_bench_branch(gen_judgment_mock, gen_answers_mock, generate_mock):
     gen_judgment_mock.assert_called()
     gen_answers_mock.assert_called()
     generate_mock.assert_called()
+    # Branch judge prompts are loaded, not the MT-Bench ones
+    judge_prompts = gen_judgment_mock.call_args.kwargs["judge_prompts"]
+    assert "similar style" in judge_prompts["single-math-v1"]["prompt_template"]
 
 
 @patch("instructlab.eval.mt_bench_answers.generate_answers")
@@ -86,6 +104,8 @@ def test_mt_bench(gen_judgment_mock, gen_answers_mock):
     mt_bench = MTBenchEvaluator(
         "instructlab/granite-7b-lab",
         "prometheus-eval/prometheus-8x7b-v2.0",
+        judge_batch_size=4,
+        judge_max_concurrent_batches=16,
     )
     mt_bench.gen_answers(
         "http://localhost:8000/v1",
@@ -100,4 +120,190 @@ def test_mt_bench(gen_judgment_mock, gen_answers_mock):
     assert error_rate == 0
 
     gen_judgment_mock.assert_called()
+    assert gen_judgment_mock.call_args.kwargs["batch_size"] == 4
+    assert gen_judgment_mock.call_args.kwargs["max_concurrent_batches"] == 16
+    judge_prompts = gen_judgment_mock.call_args.kwargs["judge_prompts"]
+    assert "single-math-v1" in judge_prompts
     gen_answers_mock.assert_called()
+
+
+@patch("instructlab.eval.mt_bench.os.sched_getaffinity", create=True)
+def test_usable_cpu_count_cached(sched_getaffinity_mock):
+    sched_getaffinity_mock.return_value = {0, 1, 2, 3}
+    _usable_cpu_count.cache_clear()
+    try:
+        mt_bench = MTBenchEvaluator(
+            "instructlab/granite-7b-lab",
+            "prometheus-eval/prometheus-8x7b-v2.0",
+        )
+        assert mt_bench._calc_max_workers("auto", None) == 32
+        assert mt_bench._calc_max_workers("auto", None) == 32
+        sched_getaffinity_mock.assert_called_once_with(0)
+    finally:
+        _usable_cpu_count.cache_clear()
+
+
+def test_calc_max_workers_auto():
+    mt_bench = MTBenchEvaluator(
+        "instructlab/granite-7b-lab",
+        "prometheus-eval/prometheus-8x7b-v2.0",
+    )
+    assert mt_bench._calc_max_workers("auto", 0) == 32
+    assert mt_bench._calc_max_workers("auto", 4) == 128
+    with patch("instructlab.eval.mt_bench._usable_cpu_count", return_value=16):
+        assert mt_bench._calc_max_workers("auto", None) == 64
+    assert mt_bench._calc_max_workers(3, 4) == 3
+
+
+@patch("instructlab.eval.mt_bench_branch_generator.generate")
+@patch(
+    "instructlab.eval.mt_bench_judgment.generate_judgment_pipelined",
+    return_value=(0, gen_qa_pairs(True), None, 0),
+)
+def test_mt_bench_branch_run_pipelined(gen_judgment_mock, generate_mock):
+    mt_bench_branch = MTBenchBranchEvaluator(
+        "instructlab/granite-7b-lab",
+        "prometheus-eval/prometheus-8x7b-v2.0",
+        "../taxonomy",
+        "main",
+    )
+    overall_score, qa_pairs, error_rate = mt_bench_branch.run_pipelined(
+        "http://localhost:8000/v1",
+        "http://localhost:8001/v1",
+    )
+    assert overall_score == 0
+    assert qa_pairs == gen_qa_pairs(True)
+    assert error_rate == 0
+
+    generate_mock.assert_called()
+    gen_answers_fn = gen_judgment_mock.call_args.args[0]
+    assert gen_answers_fn.args == (
+        "instructlab/granite-7b-lab",
+        "http://localhost:8000/v1",
+    )
+    assert gen_judgment_mock.call_args.args[3] == "http://localhost:8001/v1"
+
+
+def test_effective_max_workers_multiple_servers():
+    mt_bench = MTBenchEvaluator(
+        "instructlab/granite-7b-lab",
+        "prometheus-eval/prometheus-8x7b-v2.0",
+    )
+    server_urls = ["http://localhost:8000/v1", "http://localhost:8001/v1"]
+    assert mt_bench._get_effective_max_workers(None, None, server_urls) == 20
+    assert mt_bench._get_effective_max_workers("auto", 2, server_urls) == 128
+    assert mt_bench._get_effective_max_workers(5, 2, server_urls) == 5
+    assert mt_bench._get_effective_max_workers("auto", 2, server_urls[0]) == 64
+
+
+def test_effective_max_workers_undersaturated(caplog):
+    mt_bench = MTBenchEvaluator(
+        "instructlab/granite-7b-lab",
+        "prometheus-eval/prometheus-8x7b-v2.0",
+    )
+    assert mt_bench._get_effective_max_workers(1, 8) == 1
+    assert "max_workers=1 likely undersaturates 8 GPU model serving" in caplog.text
+
+    caplog.clear()
+    assert mt_bench._get_effective_max_workers("auto", 8) == 256
+    assert mt_bench._get_effective_max_workers(1, None) == 1
+    assert "undersaturates" not in caplog.text
+
+
+def _judge_panel_result(model_name, judge_model_name, *args, **kwargs):
+    score = 6 if judge_model_name == "judge-a" else 8
+    return score, [{"question_id": 1, "score": score}], [score, "N/A"], 0
+
+
+@patch(
+    "instructlab.eval.mt_bench_judgment.generate_judgment",
+    side_effect=_judge_panel_result,
+)
+def test_mt_bench_judge_panel(gen_judgment_mock):
+    mt_bench = MTBenchEvaluator(
+        "instructlab/granite-7b-lab",
+        ["judge-a", "judge-b"],
+        judge_aggregation="min",
+    )
+    overall_score, qa_pairs, turn_scores, error_rate = mt_bench.judge_answers(
+        {"judge-a": "http://localhost:8001/v1", "judge-b": "http://localhost:8002/v1"}
+    )
+    assert overall_score == 6
+    assert turn_scores == [6, "N/A"]
+    assert error_rate == 0
+    assert [qa_pair["judge"] for qa_pair in qa_pairs] == ["judge-a", "judge-b"]
+
+    server_urls = {
+        call.args[1]: call.args[2] for call in gen_judgment_mock.call_args_list
+    }
+    assert server_urls == {
+        "judge-a": "http://localhost:8001/v1",
+        "judge-b": "http://localhost:8002/v1",
+    }
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"judge_batch_size": 0},
+        {"judge_batch_size": "8"},
+        {"judge_max_concurrent_batches": 0},
+        {"judge_max_concurrent_batches": -1},
+    ],
+)
+def test_invalid_judge_batching(kwargs):
+    with pytest.raises(InvalidJudgeBatchError):
+        MTBenchEvaluator(
+            "instructlab/granite-7b-lab",
+            "prometheus-eval/prometheus-8x7b-v2.0",
+            **kwargs,
+        )
+
+
+def test_invalid_judge_panel():
+    with pytest.raises(InvalidJudgeAggregationError):
+        MTBenchEvaluator(
+            "instructlab/granite-7b-lab",
+            ["judge-a", "judge-b"],
+            judge_aggregation="max",
+        )
+    with pytest.raises(EmptyJudgePanelError):
+        MTBenchEvaluator("instructlab/granite-7b-lab", [])
+    with pytest.raises(DuplicateJudgeModelError):
+        MTBenchBranchEvaluator(
+            "instructlab/granite-7b-lab",
+            ["judge-a", "judge-b", "judge-a"],
+            "../taxonomy",
+            "main",
+        )
+
+
+def test_invalid_scoring_template():
+    with pytest.raises(InvalidScoringTemplateError):
+        MTBenchEvaluator(
+            "instructlab/granite-7b-lab",
+            "prometheus-eval/prometheus-8x7b-v2.0",
+            scoring_template="bogus",
+        )
+    MTBenchEvaluator(
+        "instructlab/granite-7b-lab",
+        "prometheus-eval/prometheus-8x7b-v2.0",
+        scoring_template="likert",
+    )
+
+
+@patch("instructlab.eval.mt_bench_answers.generate_answers")
+@patch("instructlab.eval.mt_bench_judgment.generate_judgment")
+def test_judge_panel_missing_server_url(gen_judgment_mock, gen_answers_mock):
+    mt_bench = MTBenchEvaluator(
+        "instructlab/granite-7b-lab",
+        ["judge-a", "judge-b"],
+    )
+    server_urls = {"judge-a": "http://localhost:8001/v1"}
+    with pytest.raises(MissingJudgeServerError) as exc_info:
+        mt_bench.judge_answers(server_urls)
+    assert exc_info.value.judge_model_name == "judge-b"
+    with pytest.raises(MissingJudgeServerError):
+        mt_bench.run_pipelined("http://localhost:8000/v1", server_urls)
+    gen_judgment_mock.assert_not_called()
+    gen_answers_mock.assert_not_called()
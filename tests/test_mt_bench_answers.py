@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 # Standard
+from unittest.mock import patch
 import json
 import os
 import random
@@ -8,7 +9,7 @@ import shutil
 import tempfile
 
 # First Party
-from instructlab.eval.mt_bench_answers import reorg_answer_file
+from instructlab.eval.mt_bench_answers import generate_answers, reorg_answer_file
 
 
 def test_reorg_answer_file():
@@ -63,3 +64,21 @@ def test_reorg_answer_file():
                 previous_question_id = qid
 
         assert new_length == orig_length
+
+
+@patch("instructlab.eval.mt_bench_answers.chat_completion_openai", return_value="Fake")
+def test_generate_answers_round_robin(chat_completion_mock, tmp_path):
+    answers = []
+    with patch.dict(os.environ, {"INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS": "4"}):
+        generate_answers(
+            "granite-7b-lab",
+            ["http://localhost:8000/v1", "http://localhost:8001/v1"],
+            output_dir=str(tmp_path),
+            on_answer=answers.append,
+        )
+    assert len(answers) == 4
+
+    base_urls = [str(c.args[0].base_url) for c in chat_completion_mock.call_args_list]
+    # 4 questions x 2 turns, 2 questions per server
+    assert base_urls.count("http://localhost:8000/v1/") == 4
+    assert base_urls.count("http://localhost:8001/v1/") == 4
@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: Apache-2.0
+
+# Standard
+from unittest.mock import patch
+import json
+import os
+
+# Third Party
+import git
+import yaml
+
+# First Party
+from instructlab.eval import mt_bench_branch_generator
+from instructlab.eval.mt_bench_common import bench_dir
+
+
+def make_taxonomy(taxonomy_dir):
+    repo = git.Repo.init(taxonomy_dir, initial_branch="main")
+    qna_dir = os.path.join(taxonomy_dir, "compositional_skills", "writing")
+    os.makedirs(qna_dir)
+    with open(os.path.join(qna_dir, "qna.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            {
+                "seed_examples": [
+                    {"question": "What is 1+1?", "answer": "2"},
+                    {"question": "Summarize it", "answer": "Hi", "context": "Hello"},
+                ]
+            },
+            f,
+        )
+    repo.index.add(["compositional_skills/writing/qna.yaml"])
+    repo.index.commit(
+        "Add qna",
+        author=git.Actor("test", "test@example.com"),
+        committer=git.Actor("test", "test@example.com"),
+    )
+    repo.git.branch("rc")
+    return repo
+
+
+def read_jsonl(file):
+    with open(file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_generate_prompt_cache(tmp_path):
+    taxonomy_dir = str(tmp_path / "taxonomy")
+    output_dir = str(tmp_path / "eval_output")
+    make_taxonomy(taxonomy_dir)
+
+    mt_bench_branch_generator.generate("judge", "rc", taxonomy_dir, output_dir)
+    output_base_dir = bench_dir(output_dir, "mt_bench_branch", "rc")
+    questions = read_jsonl(os.path.join(output_base_dir, "question.jsonl"))
+    assert [question["turns"] for question in questions] == [
+        ["What is 1+1?"],
+        [
+            "Given the context below:\nHello\nAnswer the following question: Summarize it"
+        ],
+    ]
+    assert len(os.listdir(os.path.join(output_dir, ".prompt_cache"))) == 1
+
+    os.remove(os.path.join(output_base_dir, "question.jsonl"))
+    with patch(
+        "instructlab.eval.mt_bench_branch_generator.read_questions"
+    ) as read_questions_mock:
+        mt_bench_branch_generator.generate("judge-2", "rc", taxonomy_dir, output_dir)
+    read_questions_mock.assert_not_called()
+    assert read_jsonl(os.path.join(output_base_dir, "question.jsonl")) == questions
+    reference_answers = read_jsonl(
+        os.path.join(output_base_dir, "reference_answer", "judge-2.jsonl")
+    )
+    assert [answer["choices"][0]["turns"] for answer in reference_answers] == [
+        ["2"],
+        ["Hi"],
+    ]
+
+
+def test_generate_prompt_cache_dirty_taxonomy(tmp_path):
+    taxonomy_dir = str(tmp_path / "taxonomy")
+    output_dir = str(tmp_path / "eval_output")
+    make_taxonomy(taxonomy_dir)
+    mt_bench_branch_generator.generate("judge", "rc", taxonomy_dir, output_dir)
+
+    qna_file = os.path.join(taxonomy_dir, "compositional_skills", "writing", "qna.yaml")
+    with open(qna_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            {"seed_examples": [{"question": "What is 2+2?", "answer": "4"}]}, f
+        )
+    mt_bench_branch_generator.generate("judge", "rc", taxonomy_dir, output_dir)
+    questions = read_jsonl(
+        os.path.join(bench_dir(output_dir, "mt_bench_branch", "rc"), "question.jsonl")
+    )
+    assert [question["turns"] for question in questions] == [["What is 2+2?"]]
+    # Questions read from a dirty taxonomy aren't cached
+    assert len(os.listdir(os.path.join(output_dir, ".prompt_cache"))) == 1
@@ -3,8 +3,18 @@
 # Standard
 from unittest import mock
 
+# Third Party
+import httpx
+
 # First Party
-from instructlab.eval.mt_bench_common import Judge, check_data
+from instructlab.eval.mt_bench_common import (
+    Judge,
+    check_data,
+    cpu_affinity_initializer,
+    get_openai_clients,
+    open_openai_clients,
+    warm_up_connections,
+)
 
 CHECK_DATA_EXAMPLE_QUESTIONS = [
     {
@@ -188,3 +198,80 @@ def test_check_data():
         assert "Missing reference answer to Question" in str(e)
     else:
         assert False, "Didn't fail with missing reference answer"
+
+
+def test_get_openai_clients():
+    server_urls = ["http://localhost:8000/v1", "http://localhost:8001/v1"]
+    clients = get_openai_clients(server_urls, None, max_workers=16)
+    assert [str(c.base_url) for c in clients] == [
+        "http://localhost:8000/v1/",
+        "http://localhost:8001/v1/",
+    ]
+    # One pool shared across servers, sized to the workers
+    assert clients[0]._client is clients[1]._client
+    pool = clients[0]._client._transport._pool
+    assert pool._max_connections == 16
+    assert pool._max_keepalive_connections == 16
+
+    http_client = httpx.Client()
+    clients = get_openai_clients(server_urls[0], None, http_client, 16)
+    assert len(clients) == 1
+    assert clients[0]._client is http_client
+
+
+@mock.patch("instructlab.eval.mt_bench_common.os.sched_setaffinity", create=True)
+@mock.patch(
+    "instructlab.eval.mt_bench_common.os.sched_getaffinity",
+    return_value={2, 5},
+    create=True,
+)
+def test_cpu_affinity_initializer(sched_getaffinity_mock, sched_setaffinity_mock):
+    assert cpu_affinity_initializer(False) is None
+
+    pin_worker = cpu_affinity_initializer(True)
+    for _ in range(3):
+        pin_worker()
+    assert sched_setaffinity_mock.call_args_list == [
+        mock.call(0, {2}),
+        mock.call(0, {5}),
+        mock.call(0, {2}),
+    ]
+
+
+def test_warm_up_connections():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.host == "down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(401)
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    warm_up_connections(http_client, ["http://up/v1/", "http://down/v1"], 4)
+    assert [(r.method, str(r.url)) for r in requests].count(
+        ("HEAD", "http://up/v1/models")
+    ) == 2
+    assert len(requests) == 4
+
+    requests.clear()
+    get_openai_clients("http://up/v1", None, http_client)
+    assert not requests
+    get_openai_clients("http://up/v1", None, http_client, 3, warm_up=True)
+    assert len(requests) == 3
+
+
+def test_open_openai_clients():
+    with open_openai_clients(
+        ["http://localhost:8000/v1", "http://localhost:8001/v1"], None, max_workers=4
+    ) as openai_clients:
+        http_client = openai_clients[0]._client
+        assert not http_client.is_closed
+    assert http_client.is_closed
+
+    http_client = httpx.Client()
+    with open_openai_clients("http://localhost:8000/v1", None, http_client, 4):
+        pass
+    # Left open for the caller
+    assert not http_client.is_closed
+    http_client.close()
@@ -1,11 +1,36 @@
 # SPDX-License-Identifier: Apache-2.0
 
 # Standard
+from unittest.mock import patch
+import asyncio
+import functools
+import json
 import os
+import threading
+import time
+
+# Third Party
+import pytest
 
 # First Party
-from instructlab.eval.mt_bench_common import Judge
-from instructlab.eval.mt_bench_judgment import load_judge_prompts, make_judge_single
+from instructlab.eval import mt_bench_answers
+from instructlab.eval.mt_bench_common import (
+    JUDGE_MAX_TOKENS,
+    SHORT_SCORING_MAX_TOKENS,
+    SHORT_SCORING_TEMPLATES,
+    Judge,
+)
+from instructlab.eval.mt_bench_judgment import (
+    JUDGMENT_CACHE_FILE,
+    a_generate_judgment,
+    aggregate_judgments,
+    generate_judgment,
+    generate_judgment_pipelined,
+    load_judge_prompts,
+    make_judge_single,
+    make_judgment,
+    qa_pairs_columnar,
+)
 
 
 def test_make_judge_single():
@@ -30,3 +55,300 @@ def test_make_judge_single():
     assert isinstance(judges["math-mt"], Judge)
     assert judges["math-mt"].ref_based
     assert judges["math-mt"].multi_turn
+
+
+@pytest.mark.parametrize("bench_name", ["mt_bench", "mt_bench_branch"])
+@pytest.mark.parametrize("scoring_template", list(SHORT_SCORING_TEMPLATES))
+def test_make_judge_single_scoring_template(bench_name, scoring_template):
+    judge_file = os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "src",
+        "instructlab",
+        "eval",
+        "data",
+        bench_name,
+        "judge_prompts.jsonl",
+    )
+    judge_prompts = load_judge_prompts(judge_file)
+    assert all(
+        judge.max_tokens == JUDGE_MAX_TOKENS
+        for judge in make_judge_single("judge", judge_prompts).values()
+    )
+
+    judges = make_judge_single("judge", judge_prompts, scoring_template)
+    for judge in judges.values():
+        assert judge.max_tokens == SHORT_SCORING_MAX_TOKENS
+        prompt = (
+            judge.prompt_template["system_prompt"]
+            + judge.prompt_template["prompt_template"]
+        )
+        assert SHORT_SCORING_TEMPLATES[scoring_template] in prompt
+        assert "scale of 1 to 10" not in prompt
+    # The loaded prompts are left untouched
+    assert "scale of 1 to 10" in judge_prompts["single-v1"]["prompt_template"]
+
+    with pytest.raises(ValueError):
+        make_judge_single("judge", judge_prompts, "invalid")
+
+
+@patch("instructlab.eval.mt_bench_common.chat_completion_openai", return_value="[[8]]")
+@patch("instructlab.eval.mt_bench_answers.chat_completion_openai", return_value="Fake")
+def test_generate_judgment_pipelined(answer_mock, judge_mock, tmp_path):
+    generate_answers_fn = functools.partial(
+        mt_bench_answers.generate_answers,
+        "granite-7b-lab",
+        "http://localhost:8000/v1",
+        output_dir=str(tmp_path),
+        max_workers=2,
+    )
+    overall_score, qa_pairs, turn_scores, error_rate = generate_judgment_pipelined(
+        generate_answers_fn,
+        "granite-7b-lab",
+        "prometheus-8x7b-v2-0",
+        "http://localhost:8000/v1",
+        output_dir=str(tmp_path),
+        max_workers=2,
+        first_n=2,
+        batch_size=3,
+    )
+    assert overall_score == 8
+    assert turn_scores == [8, 8]
+    assert error_rate == 0
+    # 2 questions x 2 turns
+    assert len(qa_pairs) == 4
+    assert judge_mock.call_count == 4
+
+
+def test_generate_judgment_pipelined_overlaps_answers(tmp_path):
+    lock = threading.Lock()
+    answer_calls = []
+    answer_calls_at_first_judgment = []
+
+    def answer(*args, **kwargs):
+        with lock:
+            answer_calls.append(None)
+        time.sleep(0.02)
+        return "Fake"
+
+    def judge(*args, **kwargs):
+        with lock:
+            if not answer_calls_at_first_judgment:
+                answer_calls_at_first_judgment.append(len(answer_calls))
+        return "[[8]]"
+
+    generate_answers_fn = functools.partial(
+        mt_bench_answers.generate_answers,
+        "granite-7b-lab",
+        "http://localhost:8000/v1",
+        output_dir=str(tmp_path),
+        max_workers=2,
+    )
+    with (
+        patch.dict(os.environ, {"INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS": "8"}),
+        patch("instructlab.eval.mt_bench_answers.chat_completion_openai", answer),
+        patch("instructlab.eval.mt_bench_common.chat_completion_openai", judge),
+    ):
+        _, qa_pairs, _, _ = generate_judgment_pipelined(
+            generate_answers_fn,
+            "granite-7b-lab",
+            "prometheus-8x7b-v2-0",
+            "http://localhost:8000/v1",
+            output_dir=str(tmp_path),
+            max_workers=2,
+        )
+    # 8 questions x 2 turns
+    assert len(answer_calls) == 16
+    assert len(qa_pairs) == 16
+    # Judging started while most answers were still to be generated
+    assert answer_calls_at_first_judgment[0] < 8
+
+
+@patch("instructlab.eval.mt_bench_common.chat_completion_openai", return_value="[[7]]")
+@patch("instructlab.eval.mt_bench_answers.chat_completion_openai", return_value="Fake")
+def test_generate_judgment_cache(answer_mock, judge_mock, tmp_path):
+    with patch.dict(os.environ, {"INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS": "2"}):
+        mt_bench_answers.generate_answers(
+            "granite-7b-lab", "http://localhost:8000/v1", output_dir=str(tmp_path)
+        )
+    for _ in range(2):
+        overall_score, qa_pairs, _, error_rate = generate_judgment(
+            "granite-7b-lab",
+            "prometheus-8x7b-v2-0",
+            "http://localhost:8000/v1",
+            output_dir=str(tmp_path),
+            first_n=2,
+            use_judgment_cache=True,
+            batch_size=3,
+            max_concurrent_batches=2,
+        )
+        assert overall_score == 7
+        assert len(qa_pairs) == 4
+        assert error_rate == 0
+    # Second run is served entirely from the cache
+    assert judge_mock.call_count == 4
+    assert os.path.isfile(os.path.join(tmp_path, JUDGMENT_CACHE_FILE))
+
+
+@patch("instructlab.eval.mt_bench_common.chat_completion_openai")
+@patch("instructlab.eval.mt_bench_answers.chat_completion_openai", return_value="Fake")
+def test_generate_judgment_cache_skips_unparsable(answer_mock, judge_mock, tmp_path):
+    judge_mock.side_effect = ["No rating"] + ["[[7]]"] * 4
+    with patch.dict(os.environ, {"INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS": "2"}):
+        mt_bench_answers.generate_answers(
+            "granite-7b-lab", "http://localhost:8000/v1", output_dir=str(tmp_path)
+        )
+    error_rates = []
+    for _ in range(2):
+        _, _, _, error_rate = generate_judgment(
+            "granite-7b-lab",
+            "prometheus-8x7b-v2-0",
+            "http://localhost:8000/v1",
+            output_dir=str(tmp_path),
+            first_n=2,
+            use_judgment_cache=True,
+        )
+        error_rates.append(error_rate)
+    assert error_rates == [0.25, 0]
+    # Only the unparsable judgment is requested again
+    assert judge_mock.call_count == 5
+
+
+@patch(
+    "instructlab.eval.mt_bench_judgment.generate_judgment",
+    return_value=(1.5, [{}], [1, 2], 0),
+)
+def test_a_generate_judgment(gen_judgment_mock):
+    async def judge_concurrently():
+        return await asyncio.gather(
+            a_generate_judgment("granite-7b-lab", "judge", "http://localhost:8000/v1"),
+            a_generate_judgment("granite-7b-lab", "judge", "http://localhost:8001/v1"),
+        )
+
+    results = asyncio.run(judge_concurrently())
+    assert results == [(1.5, [{}], [1, 2], 0)] * 2
+    assert gen_judgment_mock.call_count == 2
+
+
+@patch("instructlab.eval.mt_bench_common.chat_completion_openai", return_value="[[6]]")
+@patch("instructlab.eval.mt_bench_answers.chat_completion_openai", return_value="Fake")
+def test_generate_judgment_resume(answer_mock, judge_mock, tmp_path):
+    with patch.dict(os.environ, {"INSTRUCTLAB_EVAL_FIRST_N_QUESTIONS": "2"}):
+        mt_bench_answers.generate_answers(
+            "granite-7b-lab", "http://localhost:8000/v1", output_dir=str(tmp_path)
+        )
+    generate_judgment(
+        "granite-7b-lab",
+        "prometheus-8x7b-v2-0",
+        "http://localhost:8000/v1",
+        output_dir=str(tmp_path),
+        first_n=2,
+    )
+    assert judge_mock.call_count == 4
+
+    # Simulate a run interrupted after 2 judgments
+    judgment_file = os.path.join(
+        tmp_path, "mt_bench", "model_judgment", "prometheus-8x7b-v2-0_single.jsonl"
+    )
+    with open(judgment_file, encoding="utf-8") as fin:
+        lines = fin.readlines()
+    with open(judgment_file, "w", encoding="utf-8") as fout:
+        fout.writelines(lines[:2])
+
+    overall_score, qa_pairs, _, error_rate = generate_judgment(
+        "granite-7b-lab",
+        "prometheus-8x7b-v2-0",
+        "http://localhost:8000/v1",
+        output_dir=str(tmp_path),
+        first_n=2,
+        resume=True,
+    )
+    assert judge_mock.call_count == 6
+    assert overall_score == 6
+    assert len(qa_pairs) == 4
+    assert error_rate == 0
+
+
+def test_make_judgment(tmp_path):
+    question_file = os.path.join(tmp_path, "question.jsonl")
+    answer_file = os.path.join(tmp_path, "answer.jsonl")
+    judgment_file = os.path.join(tmp_path, "judgment.jsonl")
+    scores = {"1": (8, 6), "2": (4, -1), "3": (-1, 2)}
+    with open(question_file, "w", encoding="utf-8") as f:
+        for qid in scores:
+            f.write(
+                json.dumps({"question_id": qid, "category": "writing", "turns": []})
+                + "\n"
+            )
+    with open(answer_file, "w", encoding="utf-8") as f:
+        for qid in scores:
+            f.write(json.dumps({"question_id": qid, "choices": []}) + "\n")
+    with open(judgment_file, "w", encoding="utf-8") as f:
+        for qid, turn_scores in scores.items():
+            for turn, score in enumerate(turn_scores, start=1):
+                f.write(
+                    json.dumps(
+                        {"question_id": qid, "model": "m", "score": score, "turn": turn}
+                    )
+                    + "\n"
+                )
+
+    overall_score, qa_pairs, turn_scores, error_rate = make_judgment(
+        question_file, judgment_file, answer_file
+    )
+    assert overall_score == 5
+    assert turn_scores == [6, 4]
+    assert error_rate == 2 / 6
+    assert [(p["question_id"], p["score"]) for p in qa_pairs] == [
+        ("1", 8),
+        ("1", 6),
+        ("2", 4),
+        ("3", 2),
+    ]
+
+
+def test_aggregate_judgments():
+    results = [
+        (6.0, [{"question_id": 1, "score": 6}], [5.0, 7.0], 0.0),
+        (8.0, [{"question_id": 1, "score": 8}], [9.0, "N/A"], 0.5),
+        (9.0, [{"question_id": 1, "score": 9}], [10.0, 8.0], 0.0),
+    ]
+    judges = ["judge-a", "judge-b", "judge-c"]
+
+    overall_score, qa_pairs, turn_scores, error_rate = aggregate_judgments(
+        results, judges
+    )
+    assert overall_score == pytest.approx(23 / 3)
+    assert turn_scores == [8.0, 7.5]
+    assert error_rate == pytest.approx(1 / 6)
+    assert [qa_pair["judge"] for qa_pair in qa_pairs] == judges
+
+    overall_score, _, turn_scores, _ = aggregate_judgments(results, judges, "median")
+    assert overall_score == 8.0
+    assert turn_scores == [9.0, 7.5]
+
+    with pytest.raises(ValueError):
+        aggregate_judgments(results, judges, "max")
+
+
+def test_qa_pairs_columnar():
+    qa_pairs = [
+        {
+            "question_id": str(i),
+            "score": score,
+            "category": "taxonomy",
+            "question": ["q"],
+            "answer": ["a"],
+            "qna_file": f"category{i}/qna.yaml",
+        }
+        for i, score in enumerate([5, 7.5, 9])
+    ]
+    columns = qa_pairs_columnar(qa_pairs)
+    assert set(columns) == {"question_id", "score", "category", "qna_file"}
+    assert columns["score"].dtype == "float64"
+    assert columns["score"].sum() == 21.5
+    assert list(columns["question_id"]) == ["0", "1", "2"]
+
+    columns = qa_pairs_columnar([])
+    assert set(columns) == {"question_id", "score"}
+    assert len(columns["score"]) == 0
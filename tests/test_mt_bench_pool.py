@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: Apache-2.0
+
+# Standard
+from unittest.mock import patch
+import threading
+import time
+
+# First Party
+from instructlab.eval.mt_bench_pool import WorkerPool
+
+
+def test_worker_pool_reused():
+    with WorkerPool(3) as first:
+        first.submit(time.sleep, 0)
+    with WorkerPool(3) as second:
+        second.submit(time.sleep, 0)
+    with WorkerPool(5) as other:
+        other.submit(time.sleep, 0)
+    assert second._executor is first._executor
+    assert other._executor is not first._executor
+
+
+def test_worker_pool_limits_concurrency():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def task(i):
+        with lock:
+            running.append(i)
+            max_running.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(i)
+        return i
+
+    with WorkerPool(3) as executor:
+        futures = [executor.submit(task, i) for i in range(12)]
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == list(range(12))
+    assert max(max_running) <= 3
+
+
+def test_worker_pools_run_concurrently():
+    # Only passes if both runs have all of their workers running at once
+    barrier = threading.Barrier(4, timeout=5)
+    first = WorkerPool(2)
+    second = WorkerPool(2)
+    with first, second:
+        futures = [pool.submit(barrier.wait) for pool in (first, second, first, second)]
+    assert sorted(future.result() for future in futures) == [0, 1, 2, 3]
+
+
+@patch("instructlab.eval.mt_bench_pool.cpu_affinity_initializer")
+def test_worker_pool_cpu_affinity(cpu_affinity_initializer_mock):
+    pinned = threading.local()
+
+    def pin():
+        pinned.value = True
+
+    cpu_affinity_initializer_mock.return_value = pin
+    with WorkerPool(2, cpu_affinity=True) as executor:
+        future = executor.submit(lambda: getattr(pinned, "value", False))
+    assert future.result()
+    cpu_affinity_initializer_mock.assert_called_once_with(True)
+
+    with WorkerPool(2) as unpinned:
+        unpinned.submit(time.sleep, 0)
+    assert unpinned._executor is not executor._executor